@@ -11,6 +11,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from backend.health import healthz_asgi
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+application = healthz_asgi(get_asgi_application())
@@ -0,0 +1,109 @@
+"""
+JWT authentication with per-worker caching.
+
+The stock simplejwt ``JWTAuthentication`` checks the token signature and then
+loads the User from the database on every authenticated request. This
+subclass keeps two small in-process caches:
+
+- verified tokens, keyed on the raw token and kept until the token's ``exp``
+- users, keyed on the user id, kept for ``JWT_USER_CACHE_TTL`` seconds.
+  Saving or deleting a user bumps its version in the shared "auth" cache
+  (backend/cache.py), and a cached user whose version changed is loaded
+  again, so every worker sees a deactivation on its next request.
+"""
+
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import cache
+from .lru import LRUCache
+
+_token_cache = LRUCache(maxsize=settings.JWT_TOKEN_CACHE_SIZE)
+_user_cache = LRUCache(maxsize=settings.JWT_USER_CACHE_SIZE)
+
+
+def clear_auth_caches():
+    """Drop every cached token and user (used by tests)."""
+    _token_cache.clear()
+    _user_cache.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement for ``JWTAuthentication`` that skips repeated
+    signature checks and user lookups for tokens seen recently.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = _token_cache.get(raw_token)
+        if validated_token is not None:
+            return validated_token
+
+        validated_token = super().get_validated_token(raw_token)
+
+        # Never keep a token past its own expiry
+        expires_at = validated_token.get('exp')
+        if expires_at is not None:
+            _token_cache.set(raw_token, validated_token, expires_at=expires_at)
+
+        return validated_token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        cached = _user_cache.get(str(user_id)) if user_id is not None else None
+        version = _user_version(user_id)
+
+        if cached is None or cached[1] != version:
+            # Cache miss, or saved since (maybe in another worker): let
+            # simplejwt do the lookup and all of its checks
+            user = super().get_user(validated_token)
+            _user_cache.set(str(user_id), (user, version), ttl=settings.JWT_USER_CACHE_TTL)
+            return user
+
+        user = cached[0]
+
+        # Cache hit: repeat the cheap per-request checks simplejwt would do
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+def _user_version(user_id):
+    return cache.namespace('auth').get(f'user-version:{user_id}', 0)
+
+
+def _invalidate_cached_user(sender, instance, created=False, **kwargs):
+    if created:
+        return  # nothing cached yet
+    user_id = str(getattr(instance, api_settings.USER_ID_FIELD))
+    _user_cache.delete(user_id)
+    # Other workers compare this on their next request with the version they cached
+    cache.namespace('auth').set(f'user-version:{user_id}', time.time_ns(), timeout=None)
+
+
+post_save.connect(
+    _invalidate_cached_user,
+    sender=settings.AUTH_USER_MODEL,
+    dispatch_uid='cached_jwt_user_post_save',
+)
+post_delete.connect(
+    _invalidate_cached_user,
+    sender=settings.AUTH_USER_MODEL,
+    dispatch_uid='cached_jwt_user_post_delete',
+)
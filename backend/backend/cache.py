@@ -0,0 +1,352 @@
+"""
+Two-tier cache shared by the projects and vehicles apps.
+
+Each namespace (see CACHE_NAMESPACES in settings.py) reads through:
+
+1. an in-process LRU (backend/lru.py): no I/O, but private to the worker, so
+   entries are only kept for the namespace's ``local_ttl`` seconds;
+2. the shared Django cache (the namespace's ``alias`` in CACHES, 'default'
+   unless set): files under CACHE_DIR, or Redis when CACHE_REDIS_URL is set. Every gunicorn worker on the host sees
+   a value as soon as one of them has stored it.
+
+Keys are prefixed with the namespace and stored under the namespace's
+``version``, so bumping the version orphans everything stored before.
+``clear()`` does the same at runtime: it stores a new generation in the
+shared tier, which every worker picks up within GENERATION_CHECK_INTERVAL.
+
+``get_or_set`` protects expensive values from stampedes. A missing key is
+computed by one thread per worker and one worker per host while the others
+wait for the result (a flock'd file with the file backend, SET NX on Redis), and a value is recomputed
+a little before it expires (probabilistic early expiration, scaled by how
+long it took to compute) while everyone else keeps getting the current one.
+
+Hits, misses, local-tier evictions and recomputations are counted per
+namespace and per worker; see ``stats()``.
+"""
+
+import fcntl
+import hashlib
+import math
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+from .lru import LRUCache
+
+COUNTERS = ('local_hits', 'shared_hits', 'misses', 'recomputes', 'early_recomputes', 'lock_waits')
+
+# Serialise get_or_set recomputations within the worker; keys share locks by hash
+_recompute_locks = [threading.Lock() for _ in range(64)]
+
+# How often a worker waiting for another one's recomputation checks for the result
+LOCK_POLL_INTERVAL = 0.05  # seconds
+
+# How often a worker checks whether another one has cleared the namespace
+GENERATION_CHECK_INTERVAL = 1.0  # seconds
+
+
+class _FileLock:
+    """
+    Lock for the file backend: ``flock`` on a lock file under
+    ``<LOCATION>/locks/<namespace>/``.
+
+    FileBasedCache.add() is a check followed by a write, so two workers can
+    both "add" the same key; flock is atomic, and the kernel releases it if
+    the holder dies. A lock file is only deleted when its namespace is
+    cleared (another worker may be waiting on the same inode); until then
+    there is one per key computed with get_or_set.
+    """
+
+    def __init__(self, directory, key):
+        self.path = os.path.join(directory, hashlib.md5(key.encode()).hexdigest() + '.lock')
+        self._fd = None
+
+    def _try_lock(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def acquire(self):
+        self._fd = self._try_lock()
+        return self._fd is not None
+
+    def release(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def held_elsewhere(self):
+        fd = self._try_lock()
+        if fd is None:
+            return True
+        os.close(fd)
+        return False
+
+
+class _CacheKeyLock:
+    """
+    Lock stored as a key of the shared tier, taken with ``add()``: SET NX on
+    Redis, and under the backend's own lock for the in-process LocMemCache.
+    Expires after CACHE_LOCK_TIMEOUT in case the holder dies.
+    """
+
+    def __init__(self, cache, key, version):
+        self.cache = cache
+        self.key = key
+        self.version = version
+        self.token = uuid.uuid4().hex
+
+    def acquire(self):
+        return self.cache.add(self.key, self.token, timeout=settings.CACHE_LOCK_TIMEOUT, version=self.version)
+
+    def release(self):
+        if self.cache.get(self.key, version=self.version) == self.token:
+            self.cache.delete(self.key, version=self.version)
+
+    def held_elsewhere(self):
+        return self.cache.get(self.key, version=self.version) is not None
+
+
+class NamespacedCache:
+    """One namespace of the two-tier cache. Get instances from ``namespace()``."""
+
+    def __init__(self, name, version=1, local_size=1024, local_ttl=30, alias='default'):
+        self.name = name
+        self.version = version
+        self.local_ttl = local_ttl
+        self.alias = alias
+        self._local = LRUCache(maxsize=local_size)
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._counters_lock = threading.Lock()
+        self._generation = 0
+        self._generation_checked = -math.inf
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    @property
+    def _generation_key(self):
+        return f'{self.name}::generation'
+
+    @property
+    def _shared_version(self):
+        """Version for the shared tier: ``version``, plus the generation once the namespace was cleared."""
+        now = time.monotonic()
+        if now - self._generation_checked >= GENERATION_CHECK_INTERVAL:
+            generation = self.shared.get(self._generation_key, 0, version=self.version)
+            if generation != self._generation:
+                self._local.clear()
+                self._generation = generation
+            self._generation_checked = now
+        return f'{self.version}.{self._generation}' if self._generation else self.version
+
+    def _count(self, counter):
+        with self._counters_lock:
+            self._counters[counter] += 1
+
+    def _get_entry(self, key, count=True):
+        """Return the stored ``(value, expires_at, cost)`` for ``key``, or None."""
+        key = self._key(key)
+        version = self._shared_version  # first: it drops the local tier if the namespace was cleared
+        entry = self._local.get(key)
+        if entry is not None:
+            if count:
+                self._count('local_hits')
+            return entry
+
+        entry = self.shared.get(key, version=version)
+        if count:
+            self._count('misses' if entry is None else 'shared_hits')
+        if entry is not None:
+            self._store_local(key, entry)
+        return entry
+
+    def _store_local(self, key, entry):
+        if self.local_ttl <= 0:
+            return
+        expires_at = time.time() + self.local_ttl
+        if entry[1] is not None:
+            expires_at = min(expires_at, entry[1])
+        self._local.set(key, entry, expires_at=expires_at)
+
+    def _set_entry(self, key, value, timeout, cost):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        if timeout is not None and timeout <= 0:
+            self.delete(key)
+            return
+
+        expires_at = None if timeout is None else time.time() + timeout
+        entry = (value, expires_at, cost)
+        key = self._key(key)
+        self.shared.set(key, entry, timeout=timeout, version=self._shared_version)
+        self._store_local(key, entry)
+
+    def get(self, key, default=None):
+        entry = self._get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """Store ``value`` in both tiers. ``timeout`` in seconds, None for no expiry."""
+        self._set_entry(key, value, timeout, cost=0)
+
+    def delete(self, key):
+        """
+        Delete ``key`` from the shared tier and this worker's local tier.
+        Other workers may keep serving their local copy for ``local_ttl`` seconds.
+        """
+        key = self._key(key)
+        self._local.delete(key)
+        self.shared.delete(key, version=self._shared_version)
+
+    def get_or_set(self, key, compute, timeout=DEFAULT_TIMEOUT):
+        """Return the cached value for ``key``, calling ``compute()`` to fill it."""
+        entry = self._get_entry(key)
+        if entry is not None and not self._expires_early(entry):
+            return entry[0]
+
+        with _recompute_locks[hash((self.name, key)) % len(_recompute_locks)]:
+            latest = self._get_entry(key, count=False)
+            if latest is not None and (entry is None or latest[1] != entry[1]):
+                # Another thread or worker stored it while we waited for the lock
+                return latest[0]
+
+            lock = self._lock(key)
+            if not lock.acquire():
+                if latest is not None:
+                    # Someone else is already refreshing it early; ours is still valid
+                    return latest[0]
+                self._count('lock_waits')
+                latest = self._wait_for(key, lock)
+                if latest is not None:
+                    return latest[0]
+                # The other worker failed or is too slow: compute it here as well
+                if not lock.acquire():
+                    return self._recompute(key, compute, timeout, early=False)
+
+            try:
+                return self._recompute(key, compute, timeout, early=latest is not None)
+            finally:
+                lock.release()
+
+    def _lock(self, key):
+        """The cross-worker lock for recomputing ``key``, suited to the shared tier's backend."""
+        lock_key = self._key(key) + ':lock'
+        if isinstance(self.shared, FileBasedCache):
+            return _FileLock(self._lock_dir(), self.shared.make_key(lock_key, version=self._shared_version))
+        return _CacheKeyLock(self.shared, lock_key, self._shared_version)
+
+    def _lock_dir(self):
+        return os.path.join(settings.CACHES[self.alias]['LOCATION'], 'locks', self.name)
+
+    def _expires_early(self, entry):
+        """
+        True if this read should recompute ``entry`` ahead of its expiry.
+
+        The chance grows as expiry approaches and with the entry's cost, so
+        one of the readers refreshes a hot key before it falls out of the cache.
+        """
+        _, expires_at, cost = entry
+        if expires_at is None or not cost:
+            return False
+        headstart = -cost * settings.CACHE_EARLY_RECOMPUTE_BETA * math.log(1.0 - random.random())
+        return time.time() + headstart >= expires_at
+
+    def _wait_for(self, key, lock):
+        """Wait for another worker's recomputation of ``key``; return its entry or None."""
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = self.shared.get(self._key(key), version=self._shared_version)
+            if entry is not None:
+                self._store_local(self._key(key), entry)
+                return entry
+            if not lock.held_elsewhere():
+                # Lock released without a value: the computation raised
+                return None
+        return None
+
+    def _recompute(self, key, compute, timeout, early):
+        started = time.monotonic()
+        value = compute()
+        self._set_entry(key, value, timeout, cost=time.monotonic() - started)
+        self._count('recomputes')
+        if early:
+            self._count('early_recomputes')
+        return value
+
+    def clear(self):
+        """
+        Drop every entry of the namespace. This worker stops seeing them at
+        once, the others within GENERATION_CHECK_INTERVAL; the old entries
+        stay in the shared tier until they expire or are culled.
+        """
+        generation = time.time_ns()
+        self.shared.set(self._generation_key, generation, timeout=None, version=self.version)
+        self._local.clear()
+        self._generation = generation
+        self._generation_checked = time.monotonic()
+        if isinstance(self.shared, FileBasedCache):
+            # Lock files of the old generation's keys; nobody will take them again
+            shutil.rmtree(self._lock_dir(), ignore_errors=True)
+
+    def clear_local(self):
+        self._local.clear()
+
+    def stats(self):
+        """This worker's counters for the namespace, plus the local tier's size and evictions."""
+        with self._counters_lock:
+            values = dict(self._counters)
+        lookups = values['local_hits'] + values['shared_hits'] + values['misses']
+        values['hit_rate'] = (
+            round((values['local_hits'] + values['shared_hits']) / lookups, 3) if lookups else None
+        )
+        values['local_entries'] = len(self._local)
+        values['local_evictions'] = self._local.evictions
+        values['version'] = self._shared_version
+        return values
+
+
+_namespaces = {}
+_namespaces_lock = threading.Lock()
+
+
+def namespace(name):
+    """Return the cache for ``name``, configured from CACHE_NAMESPACES."""
+    cache = _namespaces.get(name)
+    if cache is None:
+        with _namespaces_lock:
+            cache = _namespaces.get(name)
+            if cache is None:
+                cache = _namespaces[name] = NamespacedCache(name, **settings.CACHE_NAMESPACES[name])
+    return cache
+
+
+def stats():
+    """Per-namespace counters of every namespace used in this worker."""
+    return {name: cache.stats() for name, cache in sorted(_namespaces.items())}
+
+
+def reset_caches():
+    """Forget every namespace and clear the shared tier (used by tests)."""
+    with _namespaces_lock:
+        _namespaces.clear()
+    for alias in settings.CACHES:
+        caches[alias].clear()
@@ -0,0 +1,86 @@
+"""
+Test data shared by the app test suites: users, Project rows and Statens
+Vegvesen payloads/responses.
+"""
+
+import json
+from datetime import timedelta
+
+import requests
+from django.contrib.auth import get_user_model
+
+from projects.models import Project
+
+
+def make_user(username='admin', password='secret-pass-123', **fields):
+    return get_user_model().objects.create_user(username=username, password=password, **fields)
+
+
+def make_project(**fields):
+    """Create one project through the ORM (model signals run)."""
+    fields.setdefault('car_name', 'Volvo V70')
+    return Project.objects.create(**fields)
+
+
+def make_projects(count, bulk=False, **fields):
+    """
+    Create ``count`` projects named "Car 0", "Car 1", ...
+
+    A field value may be a callable taking the row index, e.g.
+    ``price=lambda i: 1000 * i``. ``bulk=True`` inserts them with one
+    bulk_create, which skips the signals that maintain stats and the
+    change log.
+    """
+    projects = []
+    for i in range(count):
+        values = {'car_name': f'Car {i}'}
+        values.update({name: value(i) if callable(value) else value for name, value in fields.items()})
+        projects.append(Project(**values))
+
+    if bulk:
+        return Project.objects.bulk_create(projects)
+    for project in projects:
+        project.save()
+    return projects
+
+
+def vehicle_payload(registration='AB12345', brand='Toyota', model='Corolla', year='2020',
+                    eu_control='2025-12-31', first_registered='2020-01-15'):
+    """A kjoretoydata document for one vehicle, as returned by the upstream."""
+    return {
+        'kjennemerke': registration,
+        'kjoretoydataListe': [{
+            'kjennemerke': {'kjennemerke': registration},
+            'godkjenning': {
+                'tekniskGodkjenning': {
+                    'tekniskeData': {
+                        'generelt': {
+                            'merke': {'merke': brand},
+                            'handelsbetegnelse': model,
+                            'aarsmodell': year,
+                        }
+                    }
+                }
+            },
+            'periodiskKjoretoyKontroll': {
+                'kontrollfrist': eu_control
+            },
+            'forstegangsregistrering': {
+                'registrertForstegangNorgeDato': first_registered
+            }
+        }]
+    }
+
+
+def upstream_response(status_code=200, document=None, text=None, latency_ms=250):
+    """A real ``requests.Response`` carrying ``document`` as JSON (or ``text``)."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.encoding = 'utf-8'
+    response.elapsed = timedelta(milliseconds=latency_ms)
+    if text is not None:
+        response._content = text.encode('utf-8')
+    else:
+        response._content = json.dumps(vehicle_payload() if document is None else document).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+    return response
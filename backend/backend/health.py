@@ -0,0 +1,92 @@
+"""
+Liveness and readiness probes.
+
+- ``/healthz`` is answered by a thin WSGI/ASGI wrapper before Django is
+  involved: no URL resolving, no middleware, no DB, no auth.
+- ``/readyz`` is a normal view that checks the database connection.
+
+``/readyz/caches`` reports the answering worker's cache counters (staff only).
+"""
+
+import logging
+import os
+
+from django.db import connection
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+HEALTHZ_PATHS = ('/healthz', '/healthz/')
+HEALTHZ_BODY = b'{"status":"ok"}'
+HEALTHZ_HEADERS = [
+    ('Content-Type', 'application/json'),
+    ('Content-Length', str(len(HEALTHZ_BODY))),
+    ('Cache-Control', 'no-store'),
+]
+
+
+def healthz_wsgi(application):
+    """Wrap a WSGI application so liveness probes never reach Django."""
+    def wrapper(environ, start_response):
+        if environ.get('PATH_INFO') in HEALTHZ_PATHS:
+            start_response('200 OK', HEALTHZ_HEADERS)
+            return [HEALTHZ_BODY]
+        return application(environ, start_response)
+
+    return wrapper
+
+
+def healthz_asgi(application):
+    """Wrap an ASGI application so liveness probes never reach Django."""
+    async def wrapper(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in HEALTHZ_PATHS:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(k.lower().encode(), v.encode()) for k, v in HEALTHZ_HEADERS],
+            })
+            await send({'type': 'http.response.body', 'body': HEALTHZ_BODY})
+            return
+        await application(scope, receive, send)
+
+    return wrapper
+
+
+@never_cache
+def readyz(request):
+    """
+    GET /readyz
+
+    200 when the worker can serve traffic, 503 otherwise.
+    """
+    checks = {}
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        checks['database'] = 'ok'
+    except Exception:
+        # Details go to the log only: the probe is public
+        logger.exception('Readiness check: database unavailable')
+        checks['database'] = 'error'
+
+    ready = all(result == 'ok' for result in checks.values())
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'checks': checks},
+        status=200 if ready else 503,
+    )
+
+
+@never_cache
+def cache_stats(request):
+    """
+    GET /readyz/caches
+
+    Hit/miss/eviction counters per cache namespace, for this worker only.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff only'}, status=403)
+    return JsonResponse({'pid': os.getpid(), 'namespaces': cache.stats()})
@@ -0,0 +1,76 @@
+"""
+Per-process memory breakdown (Linux only).
+
+Reads /proc/<pid>/smaps_rollup to split a process's RSS into pages still
+shared with the gunicorn master (copy-on-write) and pages private to it.
+
+Report for every worker of a running gunicorn master:
+
+    python -m backend.memory <master_pid>
+"""
+
+import sys
+from pathlib import Path
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def smaps_rollup(pid='self'):
+    """Return the memory counters for ``pid`` in kB, or None if unavailable."""
+    try:
+        text = Path(f'/proc/{pid}/smaps_rollup').read_text()
+    except OSError:
+        return None
+
+    values = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(':')
+        if name in FIELDS:
+            values[name] = int(rest.split()[0])
+
+    values['Shared'] = values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+    values['Private'] = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values
+
+
+def child_pids(pid):
+    """Return the direct children of ``pid`` (the gunicorn workers of a master)."""
+    children = []
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            # Fields after the ")" that closes the command name: state, ppid, ...
+            fields = stat.read_text().rpartition(')')[2].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(stat.parent.name))
+    return sorted(children)
+
+
+def report(master_pid):
+    """Format a table of private vs. shared memory for a master and its workers."""
+    rows = [('master', master_pid)] + [('worker', pid) for pid in child_pids(master_pid)]
+    lines = [f"{'role':<8}{'pid':>8}{'rss':>10}{'pss':>10}{'shared':>10}{'private':>10}  (kB)"]
+    total_private = 0
+
+    for role, pid in rows:
+        mem = smaps_rollup(pid)
+        if mem is None:
+            continue
+        if role == 'worker':
+            total_private += mem['Private']
+        lines.append(
+            f"{role:<8}{pid:>8}{mem['Rss']:>10}{mem['Pss']:>10}{mem['Shared']:>10}{mem['Private']:>10}"
+        )
+
+    workers = len(rows) - 1
+    if workers:
+        lines.append(f'{workers} workers, {total_private} kB private in total, '
+                     f'{total_private // workers} kB per worker on average')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit('usage: python -m backend.memory <gunicorn_master_pid>')
+    print(report(int(sys.argv[1])))
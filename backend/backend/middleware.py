@@ -0,0 +1,116 @@
+"""
+Project-wide middleware.
+"""
+
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .lru import LRUCache
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'text/',
+)
+
+# Compressed bodies keyed on (encoding, digest of the uncompressed body)
+_compressed_cache = LRUCache(maxsize=settings.COMPRESSION_CACHE_SIZE)
+
+
+def clear_compression_cache():
+    """Drop every cached compressed body (used by tests)."""
+    _compressed_cache.clear()
+
+
+def _accepted_encodings(header):
+    """Return the content codings a client accepts (q > 0) from Accept-Encoding."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output byte-for-byte stable for the same input
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress API responses with brotli or gzip, depending on Accept-Encoding.
+
+    Only responses under ``COMPRESSION_PATH_PREFIXES`` and at least
+    ``COMPRESSION_MIN_SIZE`` bytes are compressed. Bodies of GET responses are
+    cached by content digest, so an unchanged project list is not recompressed
+    on every read.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if not request.path.startswith(tuple(settings.COMPRESSION_PATH_PREFIXES)):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+
+        # The body depends on Accept-Encoding from here on, even if we send it as-is
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        compressed = None
+        cache_key = None
+        if request.method == 'GET':
+            digest = hashlib.blake2b(response.content, digest_size=16).digest()
+            cache_key = (encoding, digest)
+            compressed = _compressed_cache.get(cache_key)
+
+        if compressed is None:
+            compressed = _compress(response.content, encoding)
+            if cache_key is not None:
+                _compressed_cache.set(cache_key, compressed)
+
+        # Skip compression if it doesn't make the response smaller
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,51 @@
+"""
+Fast JSON renderer for the API.
+
+Uses orjson when it is installed and falls back to DRF's stock
+``JSONRenderer`` otherwise, so the app keeps working without it.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# What DRF's encoder does differently from orjson's defaults: UTC datetimes
+# end in "Z", and int/float/bool/None dict keys become strings
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for ``JSONRenderer`` backed by orjson.
+
+    Output matches DRF's compact UTF-8 JSON. Pretty-printed output
+    (``indent=``, browsable API) and non-default settings (ASCII-only or
+    non-compact JSON) still go through the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        use_stock_renderer = (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        )
+        if use_stock_renderer:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self._default, option=ORJSON_OPTIONS)
+
+        # Same \u2028 / \u2029 escaping as DRF, so the output stays a strict
+        # javascript subset.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    def _default(self, obj):
+        # Lazy strings, Decimals, querysets, ... are handled the same way DRF does
+        return self.encoder_class().default(obj)
@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -28,6 +29,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests so the one opened during
+        # worker warm-up is reused
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -71,7 +76,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.tracing.TraceContextMiddleware',  # trace id for logs and upstream spans
     'corsheaders.middleware.CorsMiddleware',  # must be high in the list
+    'backend.middleware.CompressionMiddleware',  # gzip/brotli for /api/ responses
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +96,9 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5174",
 ]
 
+# Let the SPA read the change feed cursor on GET /api/projects/
+CORS_EXPOSE_HEADERS = ["X-Change-Cursor"]
+
 # Production CORS origins (read from .env if needed)
 # Add production domains to CORS_ALLOWED_ORIGINS if deploying
 if not DEBUG:
@@ -117,17 +127,160 @@ TEMPLATES = [
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",  # Browsable API + CSRF
-        "rest_framework_simplejwt.authentication.JWTAuthentication",  # SPA-friendly
+        "backend.authentication.CachedJWTAuthentication",  # SPA-friendly, caches verified tokens/users
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",  # keep open for now; tighten later
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "backend.renderers.FastJSONRenderer",  # orjson when installed
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Response compression (see backend/middleware.py)
+COMPRESSION_PATH_PREFIXES = ["/api/"]
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)  # bytes
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+COMPRESSION_CACHE_SIZE = config('COMPRESSION_CACHE_SIZE', default=128, cast=int)  # bodies per worker
+
+# Statens Vegvesen client mode: live, record (live + save responses) or
+# replay (answer from recorded responses, no network). See vehicles/corpus.py
+VEGVESEN_CLIENT_MODE = config('VEGVESEN_CLIENT_MODE', default='live')
+VEGVESEN_CORPUS_DIR = config('VEGVESEN_CORPUS_DIR', default=str(BASE_DIR / 'upstream_corpus'))
+VEGVESEN_REPLAY_LATENCY_SCALE = config('VEGVESEN_REPLAY_LATENCY_SCALE', default=1.0, cast=float)  # 0 = no delay
+
+# Upstream timeout: VEGVESEN_TIMEOUT_MULTIPLIER x the p99 of recent latencies,
+# clamped to [VEGVESEN_TIMEOUT_MIN, VEGVESEN_TIMEOUT]. VEGVESEN_TIMEOUT is used
+# alone until a worker has seen VEGVESEN_LATENCY_MIN_SAMPLES lookups.
+VEGVESEN_TIMEOUT = config('VEGVESEN_TIMEOUT', default=10.0, cast=float)  # seconds
+VEGVESEN_TIMEOUT_MIN = config('VEGVESEN_TIMEOUT_MIN', default=2.0, cast=float)  # seconds
+VEGVESEN_TIMEOUT_MULTIPLIER = config('VEGVESEN_TIMEOUT_MULTIPLIER', default=3.0, cast=float)
+VEGVESEN_LATENCY_WINDOW = config('VEGVESEN_LATENCY_WINDOW', default=200, cast=int)  # samples per worker
+VEGVESEN_LATENCY_MIN_SAMPLES = config('VEGVESEN_LATENCY_MIN_SAMPLES', default=20, cast=int)
+
+# Hedged lookups: if the upstream hasn't answered after the p95 latency, send a
+# second request and use whichever answers first. At most VEGVESEN_HEDGE_RATIO
+# extra requests per lookup, so the daily API quota grows by that fraction at worst.
+VEGVESEN_HEDGE_ENABLED = config('VEGVESEN_HEDGE_ENABLED', default=False, cast=bool)
+VEGVESEN_HEDGE_RATIO = config('VEGVESEN_HEDGE_RATIO', default=0.05, cast=float)
+VEGVESEN_HEDGE_BURST = config('VEGVESEN_HEDGE_BURST', default=5, cast=int)
+# Threads per worker for hedged lookups: 2 per concurrent lookup (1 with sync
+# workers) plus losers still running until their timeout. When none is free
+# the lookup runs unhedged on the request thread instead of queueing.
+VEGVESEN_HEDGE_THREADS = config('VEGVESEN_HEDGE_THREADS', default=8, cast=int)
+
+# Plates the upstream answered 404 for are answered locally for a while
+# (shared by the workers through the "vehicles" cache, see vehicles/registration.py)
+VEHICLE_NOT_FOUND_CACHE_TTL = config('VEHICLE_NOT_FOUND_CACHE_TTL', default=3600, cast=int)  # seconds
+
+# Open a connection to the Statens Vegvesen API when a gunicorn worker starts
+# (an unauthenticated HEAD from every worker on every fork, so opt-in)
+WARMUP_UPSTREAM_CONNECTION = config('WARMUP_UPSTREAM_CONNECTION', default=False, cast=bool)
+
+# JWT auth caches (per gunicorn worker, see backend/authentication.py); user
+# changes reach every worker through the shared cache
+JWT_TOKEN_CACHE_SIZE = config('JWT_TOKEN_CACHE_SIZE', default=1024, cast=int)
+JWT_USER_CACHE_SIZE = config('JWT_USER_CACHE_SIZE', default=256, cast=int)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=60, cast=int)  # seconds
+
+# Rows fetched from the DB (and flushed to the client) per chunk in /api/projects/export.*
+PROJECT_EXPORT_CHUNK_SIZE = config('PROJECT_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Project change feed (/api/projects/changes/ and the SSE stream)
+PROJECT_CHANGES_PAGE_SIZE = config('PROJECT_CHANGES_PAGE_SIZE', default=500, cast=int)  # changes per response
+PROJECT_CHANGES_POLL_INTERVAL = config('PROJECT_CHANGES_POLL_INTERVAL', default=1.0, cast=float)  # seconds
+PROJECT_CHANGES_HEARTBEAT = config('PROJECT_CHANGES_HEARTBEAT', default=15.0, cast=float)  # seconds
+
+# Cache shared by every gunicorn worker on the host: files under CACHE_DIR, or
+# Redis when CACHE_REDIS_URL is set (needs the redis package; recommended in
+# production, with maxmemory-policy volatile-lru). See backend/cache.py
+# The file backend lists the whole directory on every set and culls random
+# entries once it holds CACHE_MAX_ENTRIES files.
+# 'auth' holds the user versions that invalidate cached JWT users (stored
+# without expiry): kept apart so a flood of other entries can never cull them.
+CACHE_DIR = config('CACHE_DIR', default=str(BASE_DIR / '.cache'))
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+        # Same server; volatile-lru never evicts keys without a TTL
+        'auth': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=100000, cast=int)},
+        },
+        # One small file per user changed since the cache was last cleared: never culled
+        'auth': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(Path(CACHE_DIR) / 'auth'),
+            'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+        },
+    }
+
+# Per-app namespaces of that cache, each with an in-process LRU in front:
+# local_size entries kept for up to local_ttl seconds (0 = shared tier only).
+# Bump a version to drop everything stored under the namespace.
+CACHE_NAMESPACES = {
+    'auth': {'version': 1, 'local_size': 1, 'local_ttl': 0, 'alias': 'auth'},
+    'projects': {'version': 1, 'local_size': 64, 'local_ttl': 0},
+    'vehicles': {'version': 1, 'local_size': 4096, 'local_ttl': 60},
+}
+CACHE_LOCK_TIMEOUT = config('CACHE_LOCK_TIMEOUT', default=10.0, cast=float)  # seconds one recomputation may take
+CACHE_EARLY_RECOMPUTE_BETA = config('CACHE_EARLY_RECOMPUTE_BETA', default=1.0, cast=float)  # 0 = only on expiry
+
+# /api/projects/stats/ is cached until the next project write, or this long
+PROJECT_STATS_CACHE_TIMEOUT = config('PROJECT_STATS_CACHE_TIMEOUT', default=300, cast=int)  # seconds
+
+# Spans of upstream calls (backend/tracing.py), one JSON object per line; empty = off.
+# Never rotated here: point logrotate at it (the file is reopened once moved away)
+TRACE_FILE = config('TRACE_FILE', default='')
+
+# Log records carry the trace id of the request they were emitted in
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'trace_context': {'()': 'backend.tracing.TraceContextFilter'},
+    },
+    'formatters': {
+        'default': {'format': '%(asctime)s %(levelname)s %(name)s [trace %(trace_id)s] %(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['trace_context'],
+            'formatter': 'default',
+        },
+    },
+    'loggers': {
+        app: {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO')}
+        for app in ('backend', 'projects', 'vehicles')
+    },
 }
 
 # Required when 'django.contrib.staticfiles' is enabled
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic writes content-hashed file names (nginx caches them forever)
+# plus .gz/.br copies for gzip_static/brotli_static. See backend/storage.py
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "backend.storage.PrecompressedManifestStaticFilesStorage"},
+}
+
 # --- Media uploads (optional, if you will upload files) ---
 # MEDIA_URL = "/media/"
 # MEDIA_ROOT = BASE_DIR / "media"
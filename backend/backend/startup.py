@@ -0,0 +1,209 @@
+"""
+Start-up profiling for the project's entry points.
+
+Import-time profile (``python -X importtime``) of ``manage.py``,
+``backend.wsgi`` and ``backend.asgi``, summed per top-level package:
+
+    python -m backend.startup imports [--top 15]
+
+Time to first response after fork, as a new or recycled gunicorn worker
+sees it, with and without the master-side preload (see warmup.py):
+
+    python -m backend.startup fork [--path /api/projects/] [--samples 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Interpreter arguments for each entry point. `manage.py check` loads the
+# URLconf like most commands do, because they all run the system checks.
+ENTRY_POINTS = {
+    'manage.py': [str(BASE_DIR / 'manage.py'), 'check'],
+    'backend.wsgi': ['-c', 'import backend.wsgi'],
+    'backend.asgi': ['-c', 'import backend.asgi'],
+}
+
+PROJECT_PACKAGES = ('backend', 'projects', 'vehicles')
+
+# How the worker gets from fork to its first response:
+# - cold: nothing done ahead, the first request pays for everything
+# - warm-up: warm_up() in the worker only (imports happen after every fork)
+# - preload: preload() once in the master, warm_up() in the worker (gunicorn.conf.py)
+FORK_MODES = ('cold', 'warm-up', 'preload')
+
+
+def _environment():
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    return env
+
+
+def parse_importtime(text):
+    """Return ``(module, self_us, cumulative_us)`` rows from -X importtime output."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def profile_imports(args):
+    """Run the interpreter with ``args`` under -X importtime; return (wall seconds, rows)."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=BASE_DIR, env=_environment(), capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f'{" ".join(args)} failed:\n{result.stderr[-2000:]}')
+    return wall, parse_importtime(result.stderr)
+
+
+def summarize_imports(name, wall, rows, top=15):
+    """Format one entry point's profile: slowest packages and the project's own modules."""
+    packages = {}
+    for module, self_us, _ in rows:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    total = sum(packages.values())
+
+    lines = [f'{name}: {wall * 1000:.0f} ms wall, {total / 1000:.0f} ms importing {len(rows)} modules']
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f'  {self_us / 1000:8.1f} ms  {package}')
+
+    own = [row for row in rows if row[0].split('.')[0] in PROJECT_PACKAGES]
+    own_total = sum(self_us for _, self_us, _ in own)
+    lines.append(f'  project modules: {own_total / 1000:.1f} ms')
+    for module, self_us, cumulative_us in sorted(own, key=lambda row: -row[2])[:top]:
+        lines.append(f'  {self_us / 1000:8.1f} ms  {module} ({cumulative_us / 1000:.1f} ms with its imports)')
+    return '\n'.join(lines)
+
+
+def _request(application, path):
+    """Send one GET through the WSGI app; return the status code."""
+    from wsgiref.util import setup_testing_defaults
+
+    from django.conf import settings
+
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_HOST': settings.ALLOWED_HOSTS[0]}
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    body = application(environ, start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return status[0]
+
+
+def measure_fork(mode, path, samples):
+    """
+    Load the app like gunicorn's master, then fork ``samples`` workers.
+
+    Returns ``[ready, first_response, status]`` per worker: seconds from fork
+    until the worker could accept requests, and for its first request.
+    """
+    from backend.warmup import preload, warm_up
+    from backend.wsgi import application
+
+    if mode == 'preload':
+        preload()
+
+    results = []
+    for _ in range(samples):
+        read_fd, write_fd = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                os.close(read_fd)
+                if mode != 'cold':
+                    warm_up()
+                ready = time.perf_counter()
+                status = _request(application, path)
+                done = time.perf_counter()
+                os.write(write_fd, json.dumps([ready - forked, done - ready, status]).encode())
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            data = pipe.read()
+        os.waitpid(pid, 0)
+        if not data:
+            raise RuntimeError(f'Forked worker failed ({mode} {path})')
+        results.append(json.loads(data))
+    return results
+
+
+def fork_report(path, samples):
+    """Run measure_fork for every mode in a fresh interpreter; format the medians."""
+    lines = [f'Fork to first response for GET {path} ({samples} workers each, median):',
+             f"{'mode':<10}{'ready':>10}{'request':>10}{'total':>10}  status"]
+    for mode in FORK_MODES:
+        result = subprocess.run(
+            [sys.executable, '-m', 'backend.startup', '_fork', mode, path, str(samples)],
+            cwd=BASE_DIR, env=_environment(), capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f'{mode} failed:\n{result.stderr[-2000:]}')
+        runs = json.loads(result.stdout.strip().splitlines()[-1])
+        ready = statistics.median(run[0] for run in runs) * 1000
+        request = statistics.median(run[1] for run in runs) * 1000
+        total = statistics.median(run[0] + run[1] for run in runs) * 1000
+        lines.append(f'{mode:<10}{ready:>8.1f}ms{request:>8.1f}ms{total:>8.1f}ms  {runs[0][2]}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backend.startup', description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    imports = commands.add_parser('imports', help='import-time profile of the entry points')
+    imports.add_argument('--top', type=int, default=15)
+
+    fork = commands.add_parser('fork', help='time from fork to first response')
+    fork.add_argument('--path', default='/api/projects/')
+    fork.add_argument('--samples', type=int, default=5)
+
+    internal = commands.add_parser('_fork')  # one measure_fork run, JSON on stdout
+    internal.add_argument('mode', choices=FORK_MODES)
+    internal.add_argument('path')
+    internal.add_argument('samples', type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'imports':
+        for name, entry_args in ENTRY_POINTS.items():
+            wall, rows = profile_imports(entry_args)
+            print(summarize_imports(name, wall, rows, args.top), end='\n\n')
+    elif args.command == 'fork':
+        print(fork_report(args.path, args.samples))
+    else:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+        print(json.dumps(measure_fork(args.mode, args.path, args.samples)))
+
+
+if __name__ == '__main__':
+    main()
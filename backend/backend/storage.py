@@ -0,0 +1,69 @@
+"""
+Static files storage: content-hashed names plus precompressed copies.
+
+``collectstatic`` stores every file under a hashed name (ManifestStaticFilesStorage,
+so ``{% static %}`` links change whenever a file does) and then writes a
+``.gz`` and, if the Brotli package is installed, a ``.br`` next to each
+compressible file. nginx serves those directly with ``gzip_static`` /
+``brotli_static`` and lets browsers cache them forever.
+"""
+
+import gzip
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml',
+    '.ico', '.ttf', '.otf', '.eot',
+}
+
+
+def precompressed_variants(content):
+    """Return ``{suffix: bytes}`` for the encodings nginx can serve statically."""
+    variants = {
+        # mtime=0 keeps the output identical between runs
+        '.gz': gzip.compress(content, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz/.br copies of hashed files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        for name in set(self.hashed_files.values()):
+            self.compress(name)
+
+    def compress(self, name):
+        """Write the compressed copies of ``name`` that are missing and worth having."""
+        if PurePosixPath(name).suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+
+        # Hashed names are content-addressed: existing copies are up to date
+        missing = [suffix for suffix in ('.gz', '.br') if not self.exists(name + suffix)]
+        if not missing:
+            return
+
+        with self.open(name) as f:
+            content = f.read()
+        if len(content) < settings.COMPRESSION_MIN_SIZE:
+            return
+
+        for suffix, compressed in precompressed_variants(content).items():
+            # Only keep a copy that is actually smaller
+            if suffix in missing and len(compressed) < len(content):
+                self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,82 @@
+"""
+Test runner that lists tests slower than ``SLOW_TEST_THRESHOLD`` after the run.
+
+Durations are reported through ``addDuration`` as unittest does from Python
+3.12; on older Pythons the results time each test themselves. In --parallel
+runs the workers send their durations back with the other result events, so
+the report covers every process.
+"""
+
+import sys
+import time
+import unittest
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner
+
+
+class TimingMixin:
+    """Make sure ``addDuration`` is called once per test, before ``stopTest``."""
+
+    def startTest(self, test):
+        self._test_started = time.perf_counter()
+        self._duration_reported = False
+        super().startTest(test)
+
+    def addDuration(self, test, elapsed):
+        self._duration_reported = True
+        self.record_duration(test, elapsed)
+
+    def stopTest(self, test):
+        if not self._duration_reported:
+            self.addDuration(test, time.perf_counter() - self._test_started)
+        super().stopTest(test)
+
+
+class TimedTextTestResult(TimingMixin, unittest.TextTestResult):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.test_durations = []
+
+    def record_duration(self, test, elapsed):
+        self.test_durations.append((test.id(), elapsed))
+
+
+class TimedRemoteTestResult(TimingMixin, RemoteTestResult):
+    def record_duration(self, test, elapsed):
+        # Replayed on the TimedTextTestResult in the main process
+        self.events.append(('addDuration', self.test_index, elapsed))
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class TimedParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+
+
+class TimedTestRunner(DiscoverRunner):
+    parallel_test_suite = TimedParallelTestSuite
+
+    def get_resultclass(self):
+        # --debug-sql / --pdb bring their own result classes
+        return super().get_resultclass() or TimedTextTestResult
+
+    def run_suite(self, suite, **kwargs):
+        result = super().run_suite(suite, **kwargs)
+        if isinstance(result, TimedTextTestResult):
+            self.report_slow_tests(result.test_durations)
+        return result
+
+    def report_slow_tests(self, durations):
+        threshold = getattr(settings, 'SLOW_TEST_THRESHOLD', 0.5)
+        slow = sorted((item for item in durations if item[1] >= threshold), key=lambda item: -item[1])
+        if not slow or self.verbosity < 1:
+            return
+        total = sum(elapsed for _, elapsed in durations)
+        stream = sys.stderr
+        stream.write(f"\n{len(slow)} test(s) took {threshold:g}s or longer "
+                     f"({sum(elapsed for _, elapsed in slow):.2f}s of {total:.2f}s):\n")
+        for test_id, elapsed in slow:
+            stream.write(f"  {elapsed:6.2f}s  {test_id}\n")
@@ -0,0 +1,55 @@
+"""
+Settings for the test suite, used by ``manage.py test`` unless --settings or
+DJANGO_SETTINGS_MODULE says otherwise.
+
+Same as settings.py but with an in-memory database, a fast password hasher,
+no middleware the tests don't exercise, and a runner that reports slow tests.
+Safe to run with ``--parallel``: every worker gets its own in-memory database
+and its own copies of the per-process caches.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import LOGGING, MIDDLEWARE, STORAGES
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Hashing test passwords with PBKDF2 costs ~100 ms per user created or logged in
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MIDDLEWARE = [
+    name for name in MIDDLEWARE
+    if name not in (
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    )
+]
+
+# Hashed names need a collectstatic manifest, which test runs don't have
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Per-process cache, so parallel test workers don't share entries
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth'},
+}
+
+# No span file, and only errors from the app loggers (tests provoke the warnings)
+TRACE_FILE = ''
+LOGGING = {
+    **LOGGING,
+    'loggers': {name: {**logger, 'level': 'ERROR'} for name, logger in LOGGING['loggers'].items()},
+}
+
+# Never let a developer's .env point tests at the recorded corpus
+VEGVESEN_CLIENT_MODE = 'live'
+
+TEST_RUNNER = 'backend.test_runner.TimedTestRunner'
+SLOW_TEST_THRESHOLD = 0.5  # seconds; slower tests are listed after the run
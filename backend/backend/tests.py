@@ -0,0 +1,507 @@
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from unittest.mock import patch
+
+from backend import cache, tracing
+from backend.factories import make_user
+from backend.health import healthz_wsgi
+from backend.tracing import Span, TraceContextFilter, trace_context
+from backend.memory import report, smaps_rollup
+from backend.startup import parse_importtime, summarize_imports
+from backend.storage import PrecompressedManifestStaticFilesStorage, brotli
+from backend.test_runner import TimedTestRunner
+from backend.warmup import preload, warm_up
+
+
+class HealthCheckTests(TestCase):
+    """
+    Test suite for the /healthz and /readyz probes.
+    """
+
+    def test_healthz_answered_before_django(self):
+        """Test that /healthz never reaches the wrapped application"""
+        def django_app(environ, start_response):
+            raise AssertionError('Django should not be called for /healthz')
+
+        started = []
+        body = healthz_wsgi(django_app)(
+            {'PATH_INFO': '/healthz', 'REQUEST_METHOD': 'GET'},
+            lambda status_line, headers: started.append(status_line),
+        )
+
+        self.assertEqual(started, ['200 OK'])
+        self.assertEqual(b''.join(body), b'{"status":"ok"}')
+
+    def test_healthz_passes_other_paths_through(self):
+        """Test that other paths still go to Django"""
+        def django_app(environ, start_response):
+            return [b'django']
+
+        body = healthz_wsgi(django_app)({'PATH_INFO': '/api/projects/'}, None)
+
+        self.assertEqual(body, [b'django'])
+
+    def test_readyz_ok(self):
+        """Test that /readyz reports ready when the database answers"""
+        response = self.client.get(reverse('readyz'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['checks']['database'], 'ok')
+
+    @patch('backend.health.connection.cursor', side_effect=OperationalError('database is locked'))
+    def test_readyz_database_down(self, mock_cursor):
+        """Test that /readyz returns 503 when the database is unavailable"""
+        response = self.client.get(reverse('readyz'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['status'], 'unavailable')
+        self.assertEqual(response.json()['checks']['database'], 'error')
+        self.assertNotIn('database is locked', response.content.decode())
+
+
+class TraceContextTests(TestCase):
+    """
+    Test suite for the per-request trace context.
+    """
+
+    def test_every_request_gets_a_trace_id(self):
+        """Test responses carry a fresh trace id unless the caller sent a traceparent"""
+        first = self.client.get(reverse('readyz'))['X-Trace-Id']
+        second = self.client.get(reverse('readyz'))['X-Trace-Id']
+        continued = self.client.get(
+            reverse('readyz'), HTTP_TRACEPARENT='00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01',
+        )['X-Trace-Id']
+
+        self.assertRegex(first, r'^[0-9a-f]{32}$')
+        self.assertNotEqual(first, second)
+        self.assertEqual(continued, '4bf92f3577b34da6a3ce929d0e0e4736')
+
+    def test_invalid_traceparent_starts_a_new_trace(self):
+        """Test a malformed traceparent header is ignored"""
+        with trace_context('00-not-a-trace-01') as (trace_id, parent_id):
+            self.assertRegex(trace_id, r'^[0-9a-f]{32}$')
+            self.assertIsNone(parent_id)
+
+    def test_log_records_carry_the_trace_id(self):
+        """Test the logging filter adds the current trace id, or '-' outside a request"""
+        record = logging.makeLogRecord({'msg': 'hello'})
+        TraceContextFilter().filter(record)
+        self.assertEqual(record.trace_id, '-')
+
+        with trace_context() as (trace_id, _):
+            TraceContextFilter().filter(record)
+        self.assertEqual(record.trace_id, trace_id)
+
+    def test_spans_go_to_a_new_file_after_rotation(self):
+        """Test exported spans follow TRACE_FILE once logrotate has moved it away"""
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            TRACE_FILE=os.path.join(directory, 'traces.jsonl'),
+        ):
+            self.addCleanup(tracing.close_export_file)
+            Span('before').finish()
+            os.rename(os.path.join(directory, 'traces.jsonl'), os.path.join(directory, 'traces.jsonl.1'))
+            Span('after').finish()
+            tracing.close_export_file()
+
+            rotated = Path(directory, 'traces.jsonl.1').read_text().splitlines()
+            current = Path(directory, 'traces.jsonl').read_text().splitlines()
+
+        self.assertEqual([json.loads(line)['name'] for line in rotated], ['before'])
+        self.assertEqual([json.loads(line)['name'] for line in current], ['after'])
+
+
+class WarmUpTests(TestCase):
+    """
+    Test suite for the gunicorn post_fork warm-up.
+    """
+
+    @override_settings(WARMUP_UPSTREAM_CONNECTION=True)
+    @patch('backend.warmup.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
+    @patch('vehicles.client.warm_up_connection')
+    def test_warm_up(self, mock_warm_up_connection):
+        """Test that warm-up runs and primes the upstream connection when enabled"""
+        warm_up()
+
+        mock_warm_up_connection.assert_called_once()
+
+    @patch('backend.warmup.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
+    @patch('vehicles.client.warm_up_connection')
+    def test_warm_up_leaves_upstream_alone_by_default(self, mock_warm_up_connection):
+        """Test that the upstream isn't contacted unless WARMUP_UPSTREAM_CONNECTION is set"""
+        warm_up()
+
+        mock_warm_up_connection.assert_not_called()
+
+    @override_settings(WARMUP_UPSTREAM_CONNECTION=True)
+    @patch('backend.warmup.settings.STATENS_VEGVESEN_API_KEY', '')
+    @patch('vehicles.client.warm_up_connection')
+    def test_warm_up_without_api_key(self, mock_warm_up_connection):
+        """Test that the upstream isn't contacted when no API key is configured"""
+        warm_up()
+
+        mock_warm_up_connection.assert_not_called()
+
+    @patch('vehicles.client.warm_up_connection')
+    def test_preload_does_no_io(self, mock_warm_up_connection):
+        """Test that the master-side preload never touches the DB or the upstream"""
+        with self.assertNumQueries(0):
+            preload()
+
+        mock_warm_up_connection.assert_not_called()
+
+
+@unittest.skipUnless(os.path.exists('/proc/self/smaps_rollup'), 'needs Linux /proc/<pid>/smaps_rollup')
+class MemoryReportTests(unittest.TestCase):
+    """
+    Test suite for the per-worker shared/private memory report.
+    """
+
+    def test_smaps_rollup(self):
+        """Test that the current process's memory is split into shared and private"""
+        mem = smaps_rollup()
+
+        self.assertGreater(mem['Rss'], 0)
+        self.assertEqual(mem['Shared'] + mem['Private'], mem['Rss'])
+
+    def test_report_includes_master(self):
+        """Test that the report lists the given master process"""
+        self.assertIn(str(os.getpid()), report(os.getpid()))
+
+
+class StartupProfileTests(unittest.TestCase):
+    """
+    Test suite for the import-time profile of the entry points.
+    """
+
+    def test_parse_importtime(self):
+        """Test that -X importtime lines are parsed and the header is skipped"""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   vehicles.latency\n'
+            'import time:      2000 |       2120 | vehicles.client\n'
+            'unrelated output\n'
+        )
+
+        rows = parse_importtime(output)
+
+        self.assertEqual(rows, [('vehicles.latency', 120, 120), ('vehicles.client', 2000, 2120)])
+
+    def test_summary_groups_by_package(self):
+        """Test that the summary sums self time per package and lists project modules"""
+        rows = [('django.db', 3000, 3000), ('django.urls', 1000, 4000), ('vehicles.client', 1000, 1000)]
+
+        summary = summarize_imports('backend.wsgi', 0.01, rows)
+
+        self.assertIn('5 ms importing 3 modules', summary.splitlines()[0])
+        self.assertIn('4.0 ms  django', summary)
+        self.assertIn('project modules: 1.0 ms', summary)
+
+
+class PrecompressedStaticStorageTests(unittest.TestCase):
+    """
+    Test suite for the hashed + precompressed static files storage.
+    """
+
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        target = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(target.cleanup)
+        self.target = Path(target.name)
+
+        self.source = FileSystemStorage(location=source.name)
+        self.source.save('app.css', io.BytesIO(b'body { color: #333; }\n' * 200))
+        self.source.save('tiny.js', io.BytesIO(b'console.log(1)'))
+        self.source.save('logo.png', io.BytesIO(b'\x89PNG' * 500))
+
+    def collect(self):
+        """Copy and post-process the files the way collectstatic does"""
+        storage = PrecompressedManifestStaticFilesStorage(location=self.target, base_url='/static/')
+        paths = {}
+        for name in ('app.css', 'tiny.js', 'logo.png'):
+            with self.source.open(name) as f:
+                if not storage.exists(name):
+                    storage.save(name, f)
+            paths[name] = (self.source, name)
+        list(storage.post_process(paths))
+        return storage
+
+    def test_hashed_files_get_compressed_copies(self):
+        """Test that compressible hashed files get a smaller, valid .gz (and .br)"""
+        storage = self.collect()
+
+        hashed = storage.stored_name('app.css')
+        self.assertRegex(hashed, r'^app\.[0-9a-f]{12}\.css$')
+        original = (self.target / hashed).read_bytes()
+        compressed = (self.target / (hashed + '.gz')).read_bytes()
+        self.assertLess(len(compressed), len(original))
+        self.assertEqual(gzip.decompress(compressed), original)
+
+        if brotli is not None:
+            self.assertEqual(brotli.decompress((self.target / (hashed + '.br')).read_bytes()), original)
+
+    def test_small_and_binary_files_are_left_alone(self):
+        """Test that tiny files and non-text formats aren't compressed"""
+        storage = self.collect()
+
+        for name in ('tiny.js', 'logo.png'):
+            hashed = storage.stored_name(name)
+            self.assertFalse((self.target / (hashed + '.gz')).exists(), name)
+
+    def test_existing_copies_are_reused(self):
+        """Test that a second collectstatic doesn't rewrite unchanged copies"""
+        storage = self.collect()
+        compressed = self.target / (storage.stored_name('app.css') + '.gz')
+        os.utime(compressed, (0, 0))
+
+        self.collect()
+
+        self.assertEqual(compressed.stat().st_mtime, 0)
+
+
+class SlowTestReportTests(unittest.TestCase):
+    """Test the slow-test report printed by the test runner"""
+
+    @override_settings(SLOW_TEST_THRESHOLD=0.5)
+    def test_lists_slow_tests_slowest_first(self):
+        durations = [('app.tests.A.test_fast', 0.01), ('app.tests.A.test_slow', 0.7), ('app.tests.B.test_slower', 1.2)]
+
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            TimedTestRunner(verbosity=1).report_slow_tests(durations)
+
+        lines = stderr.getvalue().strip().splitlines()
+        self.assertIn('2 test(s) took 0.5s or longer', lines[0])
+        self.assertIn('app.tests.B.test_slower', lines[1])
+        self.assertIn('app.tests.A.test_slow', lines[2])
+        self.assertEqual(len(lines), 3)
+
+    @override_settings(SLOW_TEST_THRESHOLD=0.5)
+    def test_silent_without_slow_tests(self):
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            TimedTestRunner(verbosity=1).report_slow_tests([('app.tests.A.test_fast', 0.01)])
+
+        self.assertEqual(stderr.getvalue(), '')
+
+
+@override_settings(
+    CACHE_NAMESPACES={
+        'auth': {'version': 1, 'local_size': 1, 'local_ttl': 0},
+        'test': {'version': 1, 'local_size': 2, 'local_ttl': 60},
+        'shared-only': {'version': 1, 'local_size': 2, 'local_ttl': 0},
+    },
+    CACHE_LOCK_TIMEOUT=2.0,
+)
+class TwoTierCacheTests(TestCase):
+    """
+    Test suite for the namespaced two-tier cache.
+    """
+
+    def setUp(self):
+        cache.reset_caches()
+        self.addCleanup(cache.reset_caches)
+        self.cache = cache.namespace('test')
+
+    def test_local_tier_answers_before_shared_tier(self):
+        """Test that a value read once from the shared tier is then served locally"""
+        self.cache.set('a', 1)
+        self.cache.clear_local()
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+        counters = self.cache.stats()
+        self.assertEqual((counters['shared_hits'], counters['local_hits'], counters['misses']), (1, 1, 1))
+
+    def test_namespaces_and_versions_are_isolated(self):
+        """Test that the same key in another namespace or version is a different entry"""
+        self.cache.set('a', 'test')
+        cache.namespace('shared-only').set('a', 'shared-only')
+        self.assertEqual(self.cache.get('a'), 'test')
+
+        bumped = cache.NamespacedCache('test', version=2)
+        self.assertIsNone(bumped.get('a'))
+
+    def test_local_tier_evictions_are_counted(self):
+        """Test that the local LRU stays bounded and reports evictions"""
+        for key in 'abc':
+            self.cache.set(key, key)
+
+        counters = self.cache.stats()
+        self.assertEqual(counters['local_entries'], 2)
+        self.assertEqual(counters['local_evictions'], 1)
+        self.assertEqual(self.cache.get('a'), 'a')  # still in the shared tier
+
+    def test_delete_and_expiry(self):
+        """Test that deleted and expired keys are gone from both tiers"""
+        self.cache.set('a', 1)
+        self.cache.delete('a')
+        self.cache.set('b', 1, timeout=0)
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_clear_drops_only_its_namespace_in_every_worker(self):
+        """Test that clear() empties one namespace here and, after the check interval, in other workers"""
+        other_worker = cache.NamespacedCache('test', local_size=2, local_ttl=60)
+        self.cache.set('a', 1)
+        self.assertEqual(other_worker.get('a'), 1)
+        cache.namespace('shared-only').set('a', 'kept')
+
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(cache.namespace('shared-only').get('a'), 'kept')
+        with patch('backend.cache.GENERATION_CHECK_INTERVAL', 0):
+            self.assertIsNone(other_worker.get('a'))
+            other_worker.set('a', 2)
+            self.assertEqual(self.cache.get('a'), 2)
+
+    def test_get_or_set_computes_once_under_concurrency(self):
+        """Test that concurrent misses on one key run the computation once"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_set('hot', compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()['recomputes'], 1)
+
+    def test_waits_for_another_workers_recomputation(self):
+        """Test that a miss while another worker holds the lock waits for its value"""
+        shared = caches['default']
+        shared.add('shared-only:slow:lock', 'other-worker', version=1)
+        threading.Timer(0.1, lambda: shared.set('shared-only:slow', ('theirs', None, 0.1), version=1)).start()
+
+        value = cache.namespace('shared-only').get_or_set('slow', lambda: 'ours')
+
+        self.assertEqual(value, 'theirs')
+        self.assertEqual(cache.namespace('shared-only').stats()['lock_waits'], 1)
+
+    def test_get_or_set_computes_once_across_processes(self):
+        """Test that concurrent misses in several workers on the file backend run the computation once"""
+        with tempfile.TemporaryDirectory() as directory:
+            calls_path = os.path.join(directory, 'calls')
+            results_path = os.path.join(directory, 'results')
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+
+            def worker(start):
+                def compute():
+                    with open(calls_path, 'a') as f:
+                        f.write('computed\n')
+                    time.sleep(0.3)
+                    return os.getpid()
+
+                os.read(start, 1)
+                value = cache.namespace('shared-only').get_or_set('hot', compute)
+                with open(results_path, 'a') as f:
+                    f.write(f'{value}\n')
+
+            with override_settings(CACHES={'default': backend}):
+                cache.reset_caches()
+                start, go = os.pipe()
+                pids = []
+                for _ in range(4):
+                    pid = os.fork()
+                    if pid == 0:  # forked worker: never return into the test runner
+                        code = 1
+                        try:
+                            worker(start)
+                            code = 0
+                        finally:
+                            os._exit(code)
+                    pids.append(pid)
+                os.write(go, b'x' * len(pids))
+                exit_codes = [os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) for pid in pids]
+                os.close(start)
+                os.close(go)
+
+            self.assertEqual(exit_codes, [0] * 4)
+            self.assertEqual(Path(calls_path).read_text().splitlines(), ['computed'])
+            self.assertEqual(len(set(Path(results_path).read_text().splitlines())), 1)
+
+    def test_separate_alias_is_never_culled_by_other_namespaces(self):
+        """Test that filling the default file cache past MAX_ENTRIES leaves the auth alias alone"""
+        file_cache = 'django.core.cache.backends.filebased.FileBasedCache'
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={
+                'default': {'BACKEND': file_cache, 'LOCATION': directory,
+                            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 1}},
+                'auth': {'BACKEND': file_cache, 'LOCATION': os.path.join(directory, 'auth')},
+            },
+            CACHE_NAMESPACES={
+                'auth': {'version': 1, 'local_size': 1, 'local_ttl': 0, 'alias': 'auth'},
+                'shared-only': {'version': 1, 'local_size': 2, 'local_ttl': 0},
+            },
+        ):
+            cache.reset_caches()
+            cache.namespace('auth').set('user-version:1', 123, timeout=None)
+            for i in range(50):
+                cache.namespace('shared-only').set(f'not-found:{i}', True)
+
+            self.assertEqual(cache.namespace('auth').get('user-version:1'), 123)
+            self.assertLess(len(os.listdir(directory)), 50)
+
+    def test_clear_removes_lock_files(self):
+        """Test that clearing a namespace on the file backend deletes its lock files"""
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+        }):
+            cache.reset_caches()
+            shared_only = cache.namespace('shared-only')
+            shared_only.get_or_set('hot', lambda: 'value')
+            lock_dir = os.path.join(directory, 'locks', 'shared-only')
+            self.assertEqual(len(os.listdir(lock_dir)), 1)
+
+            shared_only.clear()
+
+            self.assertFalse(os.path.exists(lock_dir))
+
+    @override_settings(CACHE_EARLY_RECOMPUTE_BETA=1e9)
+    def test_expensive_values_recomputed_before_expiry(self):
+        """Test that an entry near expiry is refreshed early by a reader"""
+        self.cache.get_or_set('stats', lambda: time.sleep(0.01) or 'old', timeout=60)
+
+        self.assertEqual(self.cache.get_or_set('stats', lambda: 'new', timeout=60), 'new')
+        self.assertEqual(self.cache.stats()['early_recomputes'], 1)
+
+    def test_stats_view_is_staff_only(self):
+        """Test that /readyz/caches reports the worker's namespaces to staff"""
+        self.cache.get('a')
+        url = reverse('cache-stats')
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_login(make_user(is_staff=True))
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['namespaces']['test']['misses'], 1)
@@ -0,0 +1,303 @@
+"""
+Request trace context and spans for outgoing HTTP calls.
+
+- ``TraceContextMiddleware`` gives every request a trace id (continuing a W3C
+  ``traceparent`` header if the caller sent one) and returns it as
+  ``X-Trace-Id``. ``TraceContextFilter`` adds it to every log record emitted
+  while the request is handled.
+- ``Span`` times one operation. Finished spans are appended to TRACE_FILE as
+  JSON lines (OpenTelemetry-like field names), one file per host, so a local
+  collector or plain ``jq`` can read them. Off unless TRACE_FILE is set; the
+  file is reopened when logrotate moves it away.
+- ``TracingHTTPAdapter`` splits the time of each ``requests`` call made under
+  ``http_phases()`` into DNS, TCP connect, TLS, send and wait-for-headers; the
+  caller adds the body download.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+_TRACEPARENT = re.compile(r'00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}')
+
+# (trace_id, parent span id or None) of the request being handled
+_context = contextvars.ContextVar('trace_context', default=None)
+
+
+def _new_id(size):
+    return os.urandom(size).hex()
+
+
+def current_context():
+    """``(trace_id, parent_span_id)`` of the current request, or None outside one."""
+    return _context.get()
+
+
+@contextmanager
+def trace_context(traceparent=None):
+    """Run the block as one trace, continuing ``traceparent`` if it is valid."""
+    match = _TRACEPARENT.fullmatch(traceparent or '')
+    context = (match[1], match[2]) if match else (_new_id(16), None)
+    token = _context.set(context)
+    try:
+        yield context
+    finally:
+        _context.reset(token)
+
+
+class TraceContextMiddleware:
+    """Run each request in its own trace context; expose the id as X-Trace-Id."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with trace_context(request.headers.get('traceparent')) as (trace_id, _):
+            response = self.get_response(request)
+        response['X-Trace-Id'] = trace_id
+        return response
+
+
+class TraceContextFilter(logging.Filter):
+    """Set ``record.trace_id`` for log formats ('-' outside a request)."""
+
+    def filter(self, record):
+        context = _context.get()
+        record.trace_id = context[0] if context else '-'
+        return True
+
+
+class Span:
+    """
+    One timed operation. ``finish()`` exports it.
+
+    ``context`` is the ``(trace_id, parent_span_id)`` to attach to; it
+    defaults to the current request's (worker threads don't inherit it,
+    so pass it along explicitly).
+    """
+
+    def __init__(self, name, context=None, **attributes):
+        context = context or current_context() or (_new_id(16), None)
+        self.name = name
+        self.trace_id, self.parent_id = context
+        self.span_id = _new_id(8)
+        self.attributes = attributes
+        self.status = 'ok'
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    @property
+    def context(self):
+        """Context for child spans."""
+        return self.trace_id, self.span_id
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, error=None):
+        if error is not None:
+            self.status = 'error'
+            self.attributes['error'] = f'{type(error).__name__}: {error}'
+        self.duration = time.perf_counter() - self._started
+        export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.start_ns + round(self.duration * 1e9),
+            'duration_ms': round(self.duration * 1000, 2),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+_export_lock = threading.Lock()
+_export_fd = None
+
+
+def _export_file_is_current(fd):
+    """False once TRACE_FILE was moved away or deleted (logrotate), like WatchedFileHandler."""
+    try:
+        current = os.stat(settings.TRACE_FILE)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(fd)
+    return (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino)
+
+
+def export(span):
+    """Append ``span`` to TRACE_FILE (nothing if the setting is empty)."""
+    global _export_fd
+    if not settings.TRACE_FILE:
+        return
+    line = (json.dumps(span.to_dict(), default=str) + '\n').encode()
+    with _export_lock:
+        if _export_fd is not None and not _export_file_is_current(_export_fd):
+            os.close(_export_fd)
+            _export_fd = None
+        if _export_fd is None:
+            _export_fd = os.open(settings.TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        # One write() per span on an O_APPEND descriptor: the kernel appends each
+        # line whole, so spans from different workers don't interleave
+        os.write(_export_fd, line)
+
+
+def close_export_file():
+    """Close TRACE_FILE so the next span reopens it (used by tests)."""
+    global _export_fd
+    with _export_lock:
+        if _export_fd is not None:
+            os.close(_export_fd)
+            _export_fd = None
+
+
+class HttpPhases:
+    """Milliseconds spent in each phase of one HTTP call."""
+
+    def __init__(self):
+        self.dns_ms = 0.0
+        self.connect_ms = 0.0
+        self.tls_ms = 0.0
+        self.send_ms = 0.0
+        self.wait_ms = 0.0
+        self.connection_reused = True
+        self.headers_at = None  # perf_counter() when the response headers arrived
+
+    def as_attributes(self):
+        return {
+            'http.connection_reused': self.connection_reused,
+            'timing.dns_ms': round(self.dns_ms, 2),
+            'timing.connect_ms': round(self.connect_ms, 2),
+            'timing.tls_ms': round(self.tls_ms, 2),
+            'timing.send_ms': round(self.send_ms, 2),
+            'timing.wait_ms': round(self.wait_ms, 2),
+        }
+
+
+_phases = threading.local()
+
+
+@contextmanager
+def http_phases():
+    """Collect the phase timings of the HTTP call made in this block (this thread only)."""
+    phases = HttpPhases()
+    previous = getattr(_phases, 'current', None)
+    _phases.current = phases
+    try:
+        yield phases
+    finally:
+        _phases.current = previous
+
+
+def _current_phases():
+    return getattr(_phases, 'current', None)
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+class _PhaseTimingMixin:
+    def _new_conn(self):
+        phases = _current_phases()
+        if phases is None:
+            return super()._new_conn()
+
+        phases.connection_reused = False
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            # Let urllib3 resolve again and raise its usual error
+            return super()._new_conn()
+        phases.dns_ms += _elapsed_ms(started)
+
+        # Connect to the resolved addresses in order, as create_connection() would
+        dns_host = self._dns_host
+        error = None
+        started = time.perf_counter()
+        try:
+            for *_, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = dns_host
+            phases.connect_ms += _elapsed_ms(started)
+
+    def request(self, *args, **kwargs):
+        phases = _current_phases()
+        if phases is None:
+            return super().request(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            phases.send_ms += _elapsed_ms(started)
+
+    def getresponse(self):
+        phases = _current_phases()
+        if phases is None:
+            return super().getresponse()
+        started = time.perf_counter()
+        try:
+            return super().getresponse()
+        finally:
+            phases.wait_ms += _elapsed_ms(started)
+            phases.headers_at = time.perf_counter()
+
+
+class TracedHTTPConnection(_PhaseTimingMixin, HTTPConnection):
+    pass
+
+
+class TracedHTTPSConnection(_PhaseTimingMixin, HTTPSConnection):
+    def connect(self):
+        phases = _current_phases()
+        if phases is None:
+            return super().connect()
+        started = time.perf_counter()
+        before = phases.dns_ms + phases.connect_ms
+        super().connect()
+        # Whatever connect() spent beyond DNS + TCP connect is the TLS handshake
+        phases.tls_ms += _elapsed_ms(started) - (phases.dns_ms + phases.connect_ms - before)
+
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+
+class TracingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report phase timings to ``http_phases()``."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TracedHTTPConnectionPool,
+            'https': TracedHTTPSConnectionPool,
+        }
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
+from backend.health import cache_stats, readyz
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -8,6 +9,10 @@ from rest_framework_simplejwt.views import (
 urlpatterns = [
     path("admin/", admin.site.urls),
 
+    # Readiness probe (/healthz is answered in wsgi.py/asgi.py, before Django)
+    path("readyz", readyz, name="readyz"),
+    path("readyz/caches", cache_stats, name="cache-stats"),
+
     # JWT endpoints (optional, for Vue later)
     path("api/auth/jwt/create/", TokenObtainPairView.as_view(), name="jwt-create"),
     path("api/auth/jwt/refresh/", TokenRefreshView.as_view(), name="jwt-refresh"),
@@ -0,0 +1,59 @@
+"""
+Start-up work moved out of the first request.
+
+``preload()`` imports the URLconf, views and serializers. It only builds
+plain Python objects, so gunicorn runs it once in the master (``when_ready``)
+and every forked or recycled worker inherits the result.
+
+``warm_up()`` runs in each worker (``post_fork``) for the per-process state
+that can't be shared across a fork: the DB connection and the upstream
+TLS connection.
+"""
+
+import logging
+
+from django.apps import apps
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def preload():
+    """Import and build everything the first request would. No I/O."""
+    if not apps.ready:
+        # Only useful once Django is loaded (preload_app = True)
+        return
+
+    from django.urls import get_resolver, reverse
+
+    from projects.serializers import ProjectSerializer
+
+    # URL resolver: imports every view (DRF, simplejwt, requests, ...),
+    # builds the reverse/namespace dicts and compiles patterns
+    get_resolver().resolve('/api/projects/')
+    reverse('project-list-create')
+
+    # First serializer build fills the model's _meta caches
+    ProjectSerializer().fields
+
+
+def warm_up():
+    """Prime lazily-built, per-process state. Safe to call more than once."""
+    if not apps.ready:
+        return
+
+    from django.db import connection
+
+    from vehicles import client
+
+    # Cheap if the master already did it
+    preload()
+
+    # DB connection (kept across requests for CONN_MAX_AGE seconds)
+    connection.ensure_connection()
+
+    # Upstream TCP/TLS connection in the shared session pool
+    if settings.WARMUP_UPSTREAM_CONNECTION and settings.STATENS_VEGVESEN_API_KEY:
+        client.warm_up_connection()
+
+    logger.info('Worker warm-up complete')
@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    # `manage.py test` runs with the lighter test profile (backend/test_settings.py)
+    default_settings = 'backend.test_settings' if sys.argv[1:2] == ['test'] else 'backend.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,3 +1,184 @@
-from django.contrib import admin
+from datetime import timedelta
 
-# Register your models here.
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, Max, Min, QuerySet, Value
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import stats
+from .models import Project, ProjectChange
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    The unfiltered list is counted from the inventory counters (see stats.py);
+    filtered lists are counted up to ``count_limit`` rows, so past that the
+    changelist shows ``count_limit`` results and pages up to there.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return stats.counters()["total"]
+        return queryset.order_by()[:self.count_limit].count()
+
+
+class IndexedDateQuerySet(QuerySet):
+    """
+    QuerySet whose date drill-down queries stay on the created_at indexes.
+
+    The admin's date_hierarchy asks for MIN and MAX together and then for
+    dates()/datetimes(), a DISTINCT over every matching row. Here MIN/MAX are
+    run separately and the distinct years/months/days are found by seeking to
+    the first row of each period, one indexed MIN() per period shown.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        # SQLite only uses an index for a lone MIN/MAX
+        if not args and len(kwargs) > 1 and all(
+            isinstance(value, (Min, Max)) and value.filter is None for value in kwargs.values()
+        ):
+            return {name: super(IndexedDateQuerySet, self).aggregate(value=value)["value"]
+                    for name, value in kwargs.items()}
+        return super().aggregate(*args, **kwargs)
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None):
+        if kind not in ("year", "month", "day"):
+            return super().datetimes(field_name, kind, order=order, tzinfo=tzinfo)
+
+        tzinfo = tzinfo or timezone.get_current_timezone()
+        queryset = self.order_by()
+        periods = []
+        first = queryset.aggregate(value=Min(field_name))["value"]
+        while first is not None:
+            start = _period_start(timezone.localtime(first, tzinfo), kind)
+            periods.append(start)
+            following = queryset.filter(**{f"{field_name}__gte": _next_period(start, kind)})
+            first = following.aggregate(value=Min(field_name))["value"]
+        return periods[::-1] if order == "DESC" else periods
+
+
+def _period_start(value, kind):
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if kind in ("year", "month"):
+        value = value.replace(day=1)
+    if kind == "year":
+        value = value.replace(month=1)
+    return value
+
+
+def _next_period(start, kind):
+    if kind == "year":
+        return start.replace(year=start.year + 1)
+    if kind == "month":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    # Wall-clock arithmetic, so the next local midnight even across DST
+    return start + timedelta(days=1)
+
+
+class ProjectActionForm(ActionForm):
+    percent = forms.IntegerField(
+        required=False, min_value=-99, max_value=1000,
+        label="Price change (%)", help_text="Used by the reprice action",
+    )
+
+
+def _bulk_update(queryset, new_values, **update):
+    """
+    Apply ``update`` to every project in ``queryset`` with a single UPDATE.
+
+    queryset.update() skips model signals, so the stats counters and the change
+    log are adjusted here: ``new_values(price, is_active)`` must return each
+    row's (price, is_active) after the UPDATE. Returns the number of rows changed.
+    """
+    with transaction.atomic():
+        # Lock the rows so the snapshot matches what the UPDATE changes
+        before = list(queryset.select_for_update().values_list("pk", "price", "is_active"))
+        if not before:
+            return 0
+
+        updated = queryset.update(updated_at=timezone.now(), **update)
+
+        stats.apply_bulk_delta(
+            added=[new_values(price, is_active) for _, price, is_active in before],
+            removed=[(price, is_active) for _, price, is_active in before],
+        )
+        ProjectChange.objects.bulk_create(
+            ProjectChange(project_id=pk, action=ProjectChange.UPDATED) for pk, _, _ in before
+        )
+    return updated
+
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    """
+    Changelist tuned for large inventories: no full COUNT(*), only indexed
+    filters, ordering and date drill-down, and bulk actions as single UPDATEs.
+    """
+    list_display = ("id", "car_name", "price", "is_active", "created_at")
+    list_display_links = ("id", "car_name")
+    list_filter = ("is_active", "created_at")  # project_active_created_idx / created_at index
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    sortable_by = ("id", "price", "created_at")  # indexed columns only
+    readonly_fields = ("created_at", "updated_at")
+    list_per_page = 50
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER  # facet counts are one COUNT per filter option
+
+    action_form = ProjectActionForm
+    actions = ["activate", "deactivate", "reprice"]
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return IndexedDateQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
+
+    @admin.action(description="Activate selected projects")
+    def activate(self, request, queryset):
+        updated = _bulk_update(
+            queryset.filter(is_active=False),
+            lambda price, is_active: (price, True),
+            is_active=True,
+        )
+        self.message_user(request, f"{updated} project(s) activated.", messages.SUCCESS)
+
+    @admin.action(description="Deactivate selected projects")
+    def deactivate(self, request, queryset):
+        updated = _bulk_update(
+            queryset.filter(is_active=True),
+            lambda price, is_active: (price, False),
+            is_active=False,
+        )
+        self.message_user(request, f"{updated} project(s) deactivated.", messages.SUCCESS)
+
+    @admin.action(description="Reprice selected projects by the given percentage")
+    def reprice(self, request, queryset):
+        try:
+            percent = self.action_form.base_fields["percent"].clean(request.POST.get("percent"))
+        except ValidationError:
+            percent = None
+        if percent is None:
+            self.message_user(request, "Enter a price change between -99 and 1000 percent.", messages.ERROR)
+            return
+
+        factor = 100 + percent
+        # Integer arithmetic, rounded half up; same formula in SQL and Python
+        updated = _bulk_update(
+            queryset,
+            lambda price, is_active: ((price * factor + 50) // 100, is_active),
+            price=(F("price") * Value(factor) + Value(50)) / Value(100),
+        )
+        self.message_user(request, f"{updated} project(s) repriced.", messages.SUCCESS)
@@ -0,0 +1,70 @@
+"""
+Project change feed.
+
+Every create/update/delete appends a ProjectChange row (see signals.py and
+the import_projects command). Clients keep the id of the last change they
+saw and ask only for newer ones, either with
+GET /api/projects/changes/?since=<cursor> or over the SSE stream.
+"""
+
+import json
+
+from django.db.models import Max, Min
+
+from .models import Project, ProjectChange
+from .serializers import ProjectSerializer
+
+
+class CursorExpired(Exception):
+    """The requested cursor is older than the oldest change still in the log."""
+
+
+def latest_cursor():
+    """Id of the newest change, or 0 if the log is empty."""
+    return ProjectChange.objects.aggregate(cursor=Max("id"))["cursor"] or 0
+
+
+def changes_since(since, limit):
+    """
+    Return ``(cursor, changes, more)`` for changes newer than ``since``.
+
+    Several changes to the same project collapse into one entry carrying the
+    project's current state (``None`` once it has been deleted), so clients
+    only download each changed row once. ``cursor`` is the value to pass as
+    ``since`` next time; ``more`` is True when ``limit`` cut the page short.
+    """
+    oldest = ProjectChange.objects.aggregate(oldest=Min("id"))["oldest"]
+    if oldest is not None and since < oldest - 1:
+        raise CursorExpired()
+
+    rows = list(
+        ProjectChange.objects.filter(id__gt=since)
+        .order_by("id")
+        .values_list("id", "project_id", "action")[:limit]
+    )
+    if not rows:
+        return since, [], False
+
+    # project_id -> (cursor, action) of its latest change, in change order
+    latest = {}
+    for change_id, project_id, action in rows:
+        latest.pop(project_id, None)
+        latest[project_id] = (change_id, action)
+
+    projects = Project.objects.in_bulk(list(latest))
+    changes = []
+    for project_id, (change_id, action) in latest.items():
+        project = projects.get(project_id)
+        changes.append({
+            "cursor": change_id,
+            "action": ProjectChange.DELETED if project is None else action,
+            "id": project_id,
+            "project": ProjectSerializer(project).data if project is not None else None,
+        })
+
+    return rows[-1][0], changes, len(rows) == limit
+
+
+def format_event(change):
+    """Render one change as a server-sent event."""
+    return f"id: {change['cursor']}\nevent: change\ndata: {json.dumps(change)}\n\n"
@@ -0,0 +1,198 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from projects import stats
+from projects.models import Project, ProjectChange
+from projects.serializers import ProjectSerializer
+from projects.spreadsheet import unescape_cell
+
+# Columns a row can set (everything the serializer accepts)
+DATA_FIELDS = ["car_name", "description", "price", "is_active"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream projects from a CSV or NDJSON file into the database. Rows are "
+        "validated like the API does (ProjectSerializer) and written in batches. "
+        "Rows with an 'id' update the existing project with that id, changing "
+        "only the columns present in the row (like PATCH); if several rows in "
+        "a batch have the same id, the last one wins."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file (same columns as the export)")
+        parser.add_argument(
+            "--format", choices=["csv", "ndjson"],
+            help="Input format (default: guessed from the file extension)",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Rows per bulk INSERT and per transaction (default: 1000)",
+        )
+        parser.add_argument(
+            "--max-errors", type=int, default=20,
+            help="How many invalid rows to print before only counting them (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"File not found: {path}")
+
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        self.max_errors = options["max_errors"]
+        # One serializer for every row: building its fields is the expensive
+        # part, running validation is cheap (this is what many=True does too)
+        self.validator = ProjectSerializer()
+        self.partial_validator = ProjectSerializer(partial=True)
+        self.invalid = 0
+        written = 0
+        started = time.monotonic()
+
+        with path.open(newline="", encoding="utf-8") as f:
+            rows = enumerate(self._read_rows(f, fmt), start=1)
+
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+
+                written += self._write_batch(batch)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{written} rows imported, {self.invalid} invalid "
+                    f"({written / elapsed:,.0f} rows/s)"
+                )
+
+        # bulk_create skips model signals, so refresh the stats counters once
+        # (the change log is written per batch in _write_batch)
+        if written:
+            stats.rebuild()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {written} rows imported, {self.invalid} invalid, in {elapsed:.1f}s"
+        ))
+
+    def _read_rows(self, f, fmt):
+        """Yield one dict per input row without reading the whole file."""
+        if fmt == "csv":
+            # Cells the export escaped against spreadsheet formulas
+            for row in csv.DictReader(f):
+                yield {name: unescape_cell(value) for name, value in row.items()}
+            return
+
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield {"__error__": f"invalid JSON ({e})"}
+                    continue
+                if isinstance(row, dict):
+                    yield row
+                else:
+                    yield {"__error__": f"expected a JSON object, got {type(row).__name__}"}
+
+    def _write_batch(self, batch):
+        """Validate one batch and write it in a single transaction."""
+        new_projects = []
+        updates = {}  # id -> (line number, row, validated data); later rows replace earlier ones
+
+        for line_number, row in batch:
+            built = self._build_project(line_number, row)
+            if built is None:
+                continue
+            project_id, validated_data = built
+            if project_id is None:
+                new_projects.append(Project(**validated_data))
+            else:
+                # ON CONFLICT can't touch the same row twice in one statement
+                updates.pop(project_id, None)
+                updates[project_id] = (line_number, row, validated_data)
+
+        with transaction.atomic():
+            # Inside the transaction (and locked where the database supports
+            # it), so the rows found here are the rows the upserts write to
+            existing_ids = set(
+                Project.objects.select_for_update().filter(pk__in=updates).values_list("pk", flat=True)
+            )
+            created_with_id = []
+            # Upserts grouped by the columns they change, one statement per group
+            updated = defaultdict(list)
+            for project_id, (line_number, row, validated_data) in updates.items():
+                if project_id in existing_ids:
+                    updated[tuple(sorted(validated_data))].append(Project(pk=project_id, **validated_data))
+                    continue
+                # No such project yet: the row creates it, so it must be complete
+                try:
+                    validated_data = self.validator.run_validation(row)
+                except ValidationError as e:
+                    self._report_invalid(line_number, e.detail)
+                    continue
+                created_with_id.append(Project(pk=project_id, **validated_data))
+
+            Project.objects.bulk_create(new_projects + created_with_id)
+            for fields, projects in updated.items():
+                Project.objects.bulk_create(
+                    projects,
+                    update_conflicts=True,
+                    unique_fields=["id"],
+                    update_fields=[*fields, "updated_at"],
+                )
+            updated_projects = [project for projects in updated.values() for project in projects]
+
+            # bulk_create skips model signals, so feed the change log here
+            ProjectChange.objects.bulk_create(
+                [ProjectChange(project_id=p.pk, action=ProjectChange.CREATED) for p in new_projects + created_with_id]
+                + [ProjectChange(project_id=p.pk, action=ProjectChange.UPDATED) for p in updated_projects]
+            )
+
+        return len(new_projects) + len(created_with_id) + len(updated_projects)
+
+    def _build_project(self, line_number, row):
+        """
+        Return ``(id or None, validated data)`` for a valid row, or None (and
+        report) if invalid. Rows with an id are validated like a PATCH, so
+        they only carry the columns they contain.
+        """
+        if "__error__" in row:
+            return self._report_invalid(line_number, row["__error__"])
+
+        # id is read-only in the API; here it selects the row to update
+        project_id = row.get("id")
+        if project_id in (None, ""):
+            project_id = None
+        else:
+            try:
+                project_id = int(project_id)
+            except (TypeError, ValueError):
+                return self._report_invalid(line_number, {"id": ["A valid integer is required."]})
+
+        validator = self.validator if project_id is None else self.partial_validator
+        try:
+            validated_data = validator.run_validation(row)
+        except ValidationError as e:
+            return self._report_invalid(line_number, e.detail)
+
+        return project_id, {name: value for name, value in validated_data.items() if name in DATA_FIELDS}
+
+    def _report_invalid(self, line_number, errors):
+        self.invalid += 1
+        if self.invalid <= self.max_errors:
+            self.stderr.write(f"Row {line_number}: {errors}")
+        return None
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from projects.changes import latest_cursor
+from projects.models import ProjectChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete project change log entries older than --days. Clients polling "
+        "with an older cursor get 410 Gone and reload the full project list."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=30,
+            help="Keep changes from the last N days (default: 30)",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        # Always keep the newest entry, so stale cursors can still be detected
+        deleted, _ = ProjectChange.objects.filter(changed_at__lt=cutoff, id__lt=latest_cursor()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change log entries older than {cutoff:%Y-%m-%d}"))
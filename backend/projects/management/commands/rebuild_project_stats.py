@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from projects import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the inventory counters behind /api/projects/stats/ from the "
+        "projects table. Needed after bulk changes that skip model signals."
+    )
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        summary = stats.read()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt inventory stats: {summary['count']} projects, {summary['active']} active"
+        ))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_rename_name_project_car_name_project_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryCounter',
+            fields=[
+                ('name', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='price',
+            field=models.PositiveIntegerField(db_index=True, default=10000),
+        ),
+    ]
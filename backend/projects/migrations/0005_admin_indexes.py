@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_project_change_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['is_active', 'created_at'], name='project_active_created_idx'),
+        ),
+    ]
@@ -1,12 +1,55 @@
-from django.db import models
+from django.db import models, transaction
 
 class Project(models.Model):
     car_name = models.CharField(max_length=120)
     description = models.TextField(blank=True)
-    price = models.PositiveIntegerField(default=10000)
+    price = models.PositiveIntegerField(default=10000, db_index=True)  # indexed for min/max stats
     is_active = models.BooleanField(default=True)
-    created_at = models.DateTimeField(auto_now_add=True)  # set on create
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # set on create
     updated_at = models.DateTimeField(auto_now=True)      # set on save
 
+    class Meta:
+        indexes = [
+            # Admin changelist: is_active filter, newest first / date hierarchy
+            models.Index(fields=["is_active", "created_at"], name="project_active_created_idx"),
+        ]
+
+    def __str__(self):
+        return self.car_name
+
+    def save(self, *args, **kwargs):
+        # One transaction from the row lock taken in pre_save to the counter
+        # UPDATE in post_save (projects/signals.py)
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class InventoryCounter(models.Model):
+    """
+    Running totals over all projects (count, active count, price sum,
+    price histogram buckets), kept up to date by projects/signals.py so
+    /api/projects/stats/ never has to scan the projects table.
+    """
+    name = models.CharField(max_length=40, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class ProjectChange(models.Model):
+    """
+    Append-only log of project changes. The auto-increment id is the cursor
+    clients pass back as ?since= (or Last-Event-ID) to get only newer changes.
+    """
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTION_CHOICES = [(CREATED, "Created"), (UPDATED, "Updated"), (DELETED, "Deleted")]
+
+    project_id = models.BigIntegerField()  # not a FK: deleted projects stay in the log
+    action = models.CharField(max_length=7, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return self.car_name
\ No newline at end of file
+        return f"#{self.pk} {self.action} project {self.project_id}"
@@ -0,0 +1,55 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import stats
+from .models import Project, ProjectChange
+
+
+def _locked_values(instance):
+    """The row's stored (price, is_active), locked until the transaction ends; None if gone."""
+    return Project.objects.select_for_update().filter(pk=instance.pk).values_list("price", "is_active").first()
+
+
+@receiver(pre_save, sender=Project)
+def remember_previous_values(sender, instance, **kwargs):
+    """
+    Keep the stored price/is_active so post_save can undo their contribution.
+    The row stays locked (Project.save() is atomic), so a concurrent save of
+    the same project waits and then sees these values' replacement.
+    """
+    instance._stats_previous = None
+    if instance.pk is not None:
+        instance._stats_previous = _locked_values(instance)
+
+
+@receiver(post_save, sender=Project)
+def update_stats_on_save(sender, instance, created, **kwargs):
+    stats.apply_delta(
+        added=(instance.price, instance.is_active),
+        removed=None if created else instance._stats_previous,
+    )
+
+
+@receiver(post_save, sender=Project)
+def log_change_on_save(sender, instance, created, **kwargs):
+    ProjectChange.objects.create(
+        project_id=instance.pk,
+        action=ProjectChange.CREATED if created else ProjectChange.UPDATED,
+    )
+
+
+@receiver(pre_delete, sender=Project)
+def remember_deleted_values(sender, instance, **kwargs):
+    """Same as remember_previous_values; the delete runs in the collector's transaction."""
+    instance._stats_previous = _locked_values(instance)
+
+
+@receiver(post_delete, sender=Project)
+def update_stats_on_delete(sender, instance, **kwargs):
+    # None if a concurrent delete got there first: nothing left to subtract
+    stats.apply_delta(removed=instance._stats_previous)
+
+
+@receiver(post_delete, sender=Project)
+def log_change_on_delete(sender, instance, **kwargs):
+    ProjectChange.objects.create(project_id=instance.pk, action=ProjectChange.DELETED)
@@ -0,0 +1,26 @@
+"""
+CSV cells that are safe to open in a spreadsheet.
+
+Excel, LibreOffice and Google Sheets run a cell starting with ``=``, ``+``,
+``-``, ``@`` (or a tab / carriage return before one) as a formula, so text
+like ``=HYPERLINK(...)`` in a project description would become a live
+formula in the export. ``escape_cell`` prefixes such text with ``'``, which
+spreadsheets display as plain text; ``unescape_cell`` drops it again so
+an export can be imported back unchanged.
+"""
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def escape_cell(value):
+    """Return ``value`` for a CSV cell, with formula-like text prefixed by ``'``."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def unescape_cell(value):
+    """Undo ``escape_cell`` for a cell read back from CSV."""
+    if isinstance(value, str) and value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
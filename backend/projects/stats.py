@@ -0,0 +1,175 @@
+"""
+Precomputed inventory statistics.
+
+Counters live in the InventoryCounter table and are adjusted by a single
+UPDATE on every Project create/update/delete (see signals.py). Reading the
+stats is one small query plus two indexed min/max lookups.
+
+Bulk writes that bypass model signals (bulk_create, queryset.update) must
+call ``rebuild()`` afterwards.
+
+The API serves ``cached_read()``: the numbers are kept in the "projects"
+cache (backend/cache.py) and dropped whenever a counter changes.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When
+
+from backend import cache
+
+from .models import InventoryCounter, Project
+
+# Lower bounds of the price histogram buckets; the last bucket is open-ended.
+# Run rebuild() (manage.py rebuild_project_stats) after changing these.
+PRICE_BUCKETS = [0, 10000, 25000, 50000, 100000, 250000, 500000]
+
+CACHE_KEY = "stats"
+
+
+def _bucket_name(price):
+    lower = PRICE_BUCKETS[0]
+    for edge in PRICE_BUCKETS:
+        if price >= edge:
+            lower = edge
+    return f"price_bucket:{lower}"
+
+
+def project_counters(price, is_active):
+    """Counter contributions of a single project."""
+    return {
+        "total": 1,
+        "active": 1 if is_active else 0,
+        "price_sum": price,
+        _bucket_name(price): 1,
+    }
+
+
+def apply_delta(added=None, removed=None):
+    """
+    Add one project's contribution and/or subtract another's, in one UPDATE.
+
+    ``added`` / ``removed`` are (price, is_active) tuples.
+    """
+    apply_bulk_delta(
+        added=[added] if added is not None else [],
+        removed=[removed] if removed is not None else [],
+    )
+
+
+def apply_bulk_delta(added=(), removed=()):
+    """
+    Same as apply_delta for any number of projects, still in one UPDATE.
+
+    Used after queryset.update(), which skips model signals: pass the rows'
+    (price, is_active) before the update as ``removed`` and after it as ``added``.
+    """
+    deltas = {}
+    for rows, sign in ((added, 1), (removed, -1)):
+        for values in rows:
+            for name, amount in project_counters(*values).items():
+                deltas[name] = deltas.get(name, 0) + sign * amount
+
+    deltas = {name: amount for name, amount in deltas.items() if amount}
+    if not deltas:
+        return
+
+    InventoryCounter.objects.filter(name__in=deltas).update(
+        value=F("value") + Case(
+            *(When(name=name, then=Value(amount)) for name, amount in deltas.items()),
+            default=Value(0),
+        )
+    )
+    invalidate()
+
+
+def rebuild():
+    """
+    Recompute every counter with one full scan of the projects table.
+
+    The counters are locked before the scan and overwritten in place in the
+    same transaction, so a save's apply_delta() either lands before (and is
+    part of the scan) or waits and is applied on top of the new totals.
+    """
+    bucket_filters = {}
+    for i, lower in enumerate(PRICE_BUCKETS):
+        condition = Q(price__gte=lower)
+        if i + 1 < len(PRICE_BUCKETS):
+            condition &= Q(price__lt=PRICE_BUCKETS[i + 1])
+        bucket_filters[f"price_bucket:{lower}"] = Count("id", filter=condition)
+
+    with transaction.atomic():
+        list(InventoryCounter.objects.select_for_update().values_list("name"))
+        totals = Project.objects.aggregate(
+            total=Count("id"),
+            active=Count("id", filter=Q(is_active=True)),
+            price_sum=Sum("price"),
+            **bucket_filters,
+        )
+        # Buckets that no longer exist (PRICE_BUCKETS changed)
+        InventoryCounter.objects.exclude(name__in=totals).delete()
+        InventoryCounter.objects.bulk_create(
+            [InventoryCounter(name=name, value=value or 0) for name, value in totals.items()],
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["value"],
+        )
+    invalidate()
+
+
+def counters():
+    """All counters as a dict, initialising them on first use."""
+    values = dict(InventoryCounter.objects.values_list("name", "value"))
+    if "total" not in values:
+        # First read after the table was created: initialise it
+        rebuild()
+        values = dict(InventoryCounter.objects.values_list("name", "value"))
+    return values
+
+
+def read():
+    """Return the dashboard numbers without scanning the projects table."""
+    values = counters()
+
+    total = values["total"]
+    active = values["active"]
+
+    # Separate queries: SQLite only uses the price index for a lone MIN/MAX
+    price_min = Project.objects.aggregate(value=Min("price"))["value"]
+    price_max = Project.objects.aggregate(value=Max("price"))["value"]
+
+    histogram = []
+    for i, lower in enumerate(PRICE_BUCKETS):
+        upper = PRICE_BUCKETS[i + 1] - 1 if i + 1 < len(PRICE_BUCKETS) else None
+        histogram.append({
+            "min": lower,
+            "max": upper,
+            "count": values.get(f"price_bucket:{lower}", 0),
+        })
+
+    return {
+        "count": total,
+        "active": active,
+        "inactive": total - active,
+        "price": {
+            "min": price_min,
+            "max": price_max,
+            "avg": round(values["price_sum"] / total, 2) if total else None,
+        },
+        "histogram": histogram,
+    }
+
+
+def cached_read():
+    """read(), through the projects cache; recomputed by one worker at a time."""
+    return cache.namespace("projects").get_or_set(
+        CACHE_KEY, read, timeout=settings.PROJECT_STATS_CACHE_TIMEOUT
+    )
+
+
+def invalidate():
+    """Drop the cached numbers now, and again once the current transaction commits."""
+    projects = cache.namespace("projects")
+    projects.delete(CACHE_KEY)
+    # A read between now and the commit may have cached the old numbers again
+    transaction.on_commit(lambda: projects.delete(CACHE_KEY))
@@ -1,3 +1,627 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from backend.authentication import clear_auth_caches
+from backend.cache import reset_caches
+from backend.factories import make_project, make_projects, make_user
+from backend.middleware import clear_compression_cache
+from backend.renderers import FastJSONRenderer
+from . import stats
+from .admin import ProjectAdmin
+from .models import InventoryCounter, Project, ProjectChange
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """
+    Test suite for the cached JWT authentication used on project writes.
+    """
+
+    def setUp(self):
+        """Create a user and an authenticated client"""
+        clear_auth_caches()
+        reset_caches()
+        self.addCleanup(reset_caches)
+        self.user = make_user()
+        self.client = APIClient()
+        self.list_url = reverse('project-list-create')
+
+        response = self.client.post(
+            reverse('jwt-create'),
+            {'username': 'admin', 'password': 'secret-pass-123'},
+            format='json',
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_authenticated_create(self):
+        """Test that a valid token can create a project"""
+        response = self.client.post(self.list_url, {'car_name': 'Volvo'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_user_lookup_is_cached(self):
+        """Test that repeat requests with the same token skip the user query"""
+        # First request: user SELECT + INSERT + stats UPDATE + change log INSERT
+        with self.assertNumQueries(4):
+            self.client.post(self.list_url, {'car_name': 'Volvo'}, format='json')
+
+        # Second request: the same minus the user SELECT
+        with self.assertNumQueries(3):
+            self.client.post(self.list_url, {'car_name': 'Saab'}, format='json')
+
+    def test_deactivated_user_is_rejected(self):
+        """Test that saving the user drops it from the cache"""
+        self.client.post(self.list_url, {'car_name': 'Volvo'}, format='json')
+
+        self.user.is_active = False
+        self.user.save()
+
+        # SessionAuthentication is listed first, so DRF answers 403 rather than 401
+        response = self.client.post(self.list_url, {'car_name': 'Saab'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_deactivated_in_another_worker_is_rejected(self):
+        """Test that a save in another worker invalidates this worker's cached user"""
+        self.client.post(self.list_url, {'car_name': 'Volvo'}, format='json')
+
+        # Another worker's save can't drop our local entry, only bump the shared version
+        with patch('backend.authentication._user_cache.delete'):
+            self.user.is_active = False
+            self.user.save()
+
+        response = self.client.post(self.list_url, {'car_name': 'Saab'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_invalid_token_rejected(self):
+        """Test that a tampered token is not accepted"""
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not.a.token')
+
+        response = self.client.post(self.list_url, {'car_name': 'Volvo'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Project.objects.count(), 0)
+
+
+class ProjectListCompressionTests(TestCase):
+    """
+    Test suite for the fast JSON renderer and response compression on the project list.
+    """
+
+    def setUp(self):
+        """Create enough projects to pass the compression threshold"""
+        clear_compression_cache()
+        self.client = APIClient()
+        self.url = reverse('project-list-create')
+        make_projects(50, bulk=True, description='Well kept, one owner')
+
+    def test_renderer_matches_stock_json(self):
+        """Test that the fast renderer produces the same JSON as DRF"""
+        data = {'car_name': 'Škoda \u2028', 'price': 10000, 'items': [1, 2, None]}
+
+        rendered = FastJSONRenderer().render(data)
+
+        self.assertEqual(json.loads(rendered), data)
+        self.assertIn(b'\\u2028', rendered)
+
+    def test_renderer_matches_stock_datetimes_and_keys(self):
+        """Test that UTC datetimes and non-string dict keys render byte for byte like DRF"""
+        data = {
+            'updated_at': datetime(2024, 1, 2, 3, 4, 5, 120, tzinfo=dt_timezone.utc),
+            'counts': {1: 'one', 2.5: 'two and a half', False: 'no', None: 'none'},
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_gzip_response(self):
+        """Test that large list responses are gzipped when the client accepts it"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 50)
+
+    def test_no_compression_without_accept_encoding(self):
+        """Test that responses are sent as-is to clients that don't accept gzip"""
+        response = self.client.get(self.url)
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(response.json()), 50)
+
+    def test_small_response_not_compressed(self):
+        """Test that responses below the size threshold are not compressed"""
+        project = Project.objects.first()
+        response = self.client.get(reverse('project-detail', args=[project.pk]), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_unchanged_list_is_not_recompressed(self):
+        """Test that repeat reads of the same list reuse the compressed body"""
+        with patch('backend.middleware.gzip.compress', wraps=gzip.compress) as mock_compress:
+            first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(first.content, second.content)
+        mock_compress.assert_called_once()
+
+
+class ProjectExportTests(TestCase):
+    """
+    Test suite for the streaming CSV/NDJSON project export.
+    """
+
+    def setUp(self):
+        """Create a few projects to export"""
+        self.client = APIClient()
+        make_projects(5, bulk=True, description='Line one\nline "two"', price=lambda i: 1000 * i)
+
+    def test_csv_export(self):
+        """Test that the CSV export streams a header and one row per project"""
+        response = self.client.get(reverse('project-export', args=['csv']), HTTP_ACCEPT='text/csv')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1]['description'], 'Line one\nline "two"')
+        self.assertEqual(rows[1]['price'], '1000')
+
+    def test_csv_export_escapes_formulas(self):
+        """Test that text a spreadsheet would run as a formula is exported as plain text"""
+        make_project(car_name='=HYPERLINK("http://example.com")', description='- one owner')
+
+        content = b''.join(self.client.get(reverse('project-export', args=['csv'])).streaming_content).decode()
+        row = list(csv.DictReader(io.StringIO(content)))[-1]
+
+        self.assertEqual(row['car_name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['description'], "'- one owner")
+
+    @patch('projects.views.settings.PROJECT_EXPORT_CHUNK_SIZE', 2)
+    def test_ndjson_export_matches_api(self):
+        """Test that NDJSON rows match the JSON API, across several chunks"""
+        response = self.client.get(reverse('project-export', args=['ndjson']))
+        chunks = list(response.streaming_content)
+
+        self.assertEqual(len(chunks), 3)
+        exported = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        api_rows = sorted(self.client.get(reverse('project-list-create')).json(), key=lambda row: row['id'])
+        self.assertEqual(exported, api_rows)
+
+    def test_unknown_format(self):
+        """Test that an unsupported export format is rejected"""
+        response = self.client.get(reverse('project-export', args=['xml']))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+
+class ImportProjectsCommandTests(TestCase):
+    """
+    Test suite for the import_projects management command.
+    """
+
+    def setUp(self):
+        """Create a scratch directory for input files"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def import_file(self, name, content, *args):
+        path = Path(self.tmp.name) / name
+        path.write_text(content, encoding='utf-8')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_projects', str(path), *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import(self):
+        """Test that valid CSV rows are imported in batches"""
+        content = 'car_name,description,price,is_active\n' + ''.join(
+            f'Car {i},Imported,{1000 + i},true\n' for i in range(5)
+        )
+
+        out, err = self.import_file('projects.csv', content, '--batch-size', '2')
+
+        self.assertEqual(Project.objects.count(), 5)
+        self.assertEqual(Project.objects.get(car_name='Car 3').price, 1003)
+        self.assertIn('5 rows imported, 0 invalid', out)
+        self.assertEqual(err, '')
+
+    def test_invalid_rows_are_skipped(self):
+        """Test that rows failing serializer validation are reported, not imported"""
+        content = '{"car_name": "Volvo", "price": 5000}\n{"car_name": "", "price": -1}\nnot json\n'
+
+        out, err = self.import_file('projects.ndjson', content)
+
+        self.assertEqual(Project.objects.count(), 1)
+        self.assertIn('1 rows imported, 2 invalid', out)
+        self.assertIn('Row 2', err)
+        self.assertIn('Row 3', err)
+
+    def test_ndjson_lines_that_are_not_objects_are_skipped(self):
+        """Test that valid JSON which isn't an object is reported as an invalid row"""
+        content = '[1, 2]\n"Volvo"\n{"car_name": "Volvo", "price": 5000}\n'
+
+        out, err = self.import_file('projects.ndjson', content)
+
+        self.assertEqual(Project.objects.count(), 1)
+        self.assertIn('1 rows imported, 2 invalid', out)
+        self.assertIn('Row 1: expected a JSON object, got list', err)
+        self.assertIn('Row 2: expected a JSON object, got str', err)
+
+    def test_rows_with_id_update_existing_projects(self):
+        """Test that rows with an id upsert instead of inserting duplicates"""
+        project = make_project(car_name='Old name', price=1000)
+        content = json.dumps({'id': project.pk, 'car_name': 'New name', 'price': 2000}) + '\n'
+
+        self.import_file('projects.ndjson', content)
+
+        project.refresh_from_db()
+        self.assertEqual(Project.objects.count(), 1)
+        self.assertEqual(project.car_name, 'New name')
+        self.assertEqual(project.price, 2000)
+
+    def test_rows_with_id_only_change_present_columns(self):
+        """Test that an id row without optional columns keeps their current values"""
+        project = make_project(car_name='Old name', description='Keep me', price=1000, is_active=False)
+        content = json.dumps({'id': project.pk, 'price': 2000}) + '\n'
+
+        self.import_file('projects.ndjson', content)
+
+        project.refresh_from_db()
+        self.assertEqual(project.price, 2000)
+        self.assertEqual(project.car_name, 'Old name')
+        self.assertEqual(project.description, 'Keep me')
+        self.assertFalse(project.is_active)
+
+    def test_duplicate_ids_in_one_batch_keep_the_last_row(self):
+        """Test that repeated ids in a batch don't abort the upsert"""
+        project = make_project(car_name='Old name', price=1000)
+        content = ''.join(
+            json.dumps({'id': project.pk, 'car_name': name, 'price': price}) + '\n'
+            for name, price in (('First', 2000), ('Second', 3000))
+        )
+
+        out, err = self.import_file('projects.ndjson', content)
+
+        project.refresh_from_db()
+        self.assertEqual((project.car_name, project.price), ('Second', 3000))
+        self.assertIn('1 rows imported, 0 invalid', out)
+        self.assertEqual(ProjectChange.objects.filter(project_id=project.pk, action=ProjectChange.UPDATED).count(), 1)
+
+    def test_unknown_id_needs_a_complete_row(self):
+        """Test that an id row creating a project is validated like a create"""
+        content = json.dumps({'id': 500, 'price': 2000}) + '\n' + json.dumps({'id': 501, 'car_name': 'New'}) + '\n'
+
+        out, err = self.import_file('projects.ndjson', content)
+
+        self.assertEqual(list(Project.objects.values_list('pk', 'car_name')), [(501, 'New')])
+        self.assertIn('Row 1', err)
+
+    def test_export_round_trip(self):
+        """Test that a CSV export can be imported back unchanged"""
+        make_project(car_name='Volvo', description='Line one\nline two', price=1234)
+        make_project(car_name='+Saab', description='- one owner', price=1)
+        export = b''.join(self.client.get(reverse('project-export', args=['csv'])).streaming_content)
+        Project.objects.all().delete()
+
+        self.import_file('export.csv', export.decode())
+
+        project, formula_like = Project.objects.order_by('-price')
+        self.assertEqual(project.description, 'Line one\nline two')
+        self.assertEqual(project.price, 1234)
+        self.assertEqual((formula_like.car_name, formula_like.description), ('+Saab', '- one owner'))
+
+
+class ProjectStatsTests(TestCase):
+    """
+    Test suite for the precomputed inventory stats endpoint.
+    """
+
+    def setUp(self):
+        """Create an authenticated client and a few projects through the API"""
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('project-stats')
+        reset_caches()
+        self.addCleanup(reset_caches)
+        stats.rebuild()  # start from initialised (zero) counters
+
+        for car_name, price, is_active in (('Volvo', 5000, True), ('Saab', 30000, True), ('Audi', 600000, False)):
+            self.client.post(
+                reverse('project-list-create'),
+                {'car_name': car_name, 'price': price, 'is_active': is_active},
+                format='json',
+            )
+
+    def test_stats(self):
+        """Test counts, price stats and histogram buckets"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['active'], 2)
+        self.assertEqual(response.data['inactive'], 1)
+        self.assertEqual(response.data['price'], {'min': 5000, 'max': 600000, 'avg': 211666.67})
+
+        buckets = {bucket['min']: bucket['count'] for bucket in response.data['histogram']}
+        self.assertEqual(buckets[0], 1)
+        self.assertEqual(buckets[25000], 1)
+        self.assertEqual(buckets[500000], 1)
+        self.assertEqual(sum(buckets.values()), 3)
+
+    def test_stats_follow_updates_and_deletes(self):
+        """Test that counters stay equal to a full recount after update and delete"""
+        volvo = Project.objects.get(car_name='Volvo')
+        saab = Project.objects.get(car_name='Saab')
+
+        self.client.patch(reverse('project-detail', args=[volvo.pk]), {'price': 120000, 'is_active': False}, format='json')
+        self.client.delete(reverse('project-detail', args=[saab.pk]))
+        incremental = self.client.get(self.url).data
+
+        stats.rebuild()
+        self.assertEqual(incremental, self.client.get(self.url).data)
+        self.assertEqual(incremental['count'], 2)
+        self.assertEqual(incremental['active'], 0)
+
+    def test_stale_copies_only_count_the_stored_row(self):
+        """Test that saving or deleting an outdated copy of a project adjusts the counters by the row's current values"""
+        volvo = Project.objects.get(car_name='Volvo')
+        stale = Project.objects.get(pk=volvo.pk)
+
+        volvo.price = 120000
+        volvo.save()
+        stale.price = 7000
+        stale.save()
+        volvo.delete()
+        stale.delete()  # already gone: must not be subtracted twice
+        incremental = stats.counters()
+
+        stats.rebuild()
+        self.assertEqual(incremental, stats.counters())
+        self.assertEqual(incremental['total'], 2)
+
+    def test_stats_read_is_constant_time(self):
+        """Test that reading stats doesn't depend on the number of projects"""
+        # Counter rows + MIN(price) + MAX(price)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+    def test_stats_cached_until_next_write(self):
+        """Test that repeated reads skip the database and a write drops the cached numbers"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['count'], 3)
+
+        self.client.post(reverse('project-list-create'), {'car_name': 'Kia', 'price': 1000}, format='json')
+
+        self.assertEqual(self.client.get(self.url).data['count'], 4)
+
+    def test_stats_initialised_on_first_read(self):
+        """Test that missing counters are rebuilt from the projects table"""
+        InventoryCounter.objects.all().delete()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['count'], 3)
+
+
+class ProjectChangeFeedTests(TestCase):
+    """
+    Test suite for the project change log, ?since= delta endpoint and SSE stream.
+    """
+
+    def setUp(self):
+        """Create an authenticated client and remember the starting cursor"""
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('project-changes')
+
+        response = self.client.get(reverse('project-list-create'))
+        self.cursor = int(response['X-Change-Cursor'])
+
+    def create_project(self, car_name):
+        response = self.client.post(reverse('project-list-create'), {'car_name': car_name}, format='json')
+        return response.data['id']
+
+    def test_changes_since_cursor(self):
+        """Test that only projects changed after the cursor are returned, once each"""
+        volvo = self.create_project('Volvo')
+        saab = self.create_project('Saab')
+        self.client.patch(reverse('project-detail', args=[volvo]), {'price': 1}, format='json')
+        self.client.delete(reverse('project-detail', args=[saab]))
+
+        response = self.client.get(self.url, {'since': self.cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['more'])
+        changes = {change['id']: change for change in response.data['changes']}
+        self.assertEqual(len(response.data['changes']), 2)
+        self.assertEqual(changes[volvo]['project']['price'], 1)
+        self.assertEqual(changes[saab]['action'], 'deleted')
+        self.assertIsNone(changes[saab]['project'])
+
+        # Nothing new since the returned cursor
+        response = self.client.get(self.url, {'since': response.data['cursor']})
+        self.assertEqual(response.data['changes'], [])
+
+    @override_settings(PROJECT_CHANGES_PAGE_SIZE=2)
+    def test_changes_are_paged(self):
+        """Test that large deltas are split and flagged with more=True"""
+        for car_name in ('A', 'B', 'C'):
+            self.create_project(car_name)
+
+        first = self.client.get(self.url, {'since': self.cursor}).data
+        second = self.client.get(self.url, {'since': first['cursor']}).data
+
+        self.assertTrue(first['more'])
+        self.assertEqual(len(first['changes']) + len(second['changes']), 3)
+
+    def test_invalid_cursor(self):
+        """Test that a missing or malformed cursor is rejected"""
+        for params in ({}, {'since': 'abc'}, {'since': -1}):
+            response = self.client.get(self.url, params)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pruned_cursor_is_gone(self):
+        """Test that a cursor older than the retained log returns 410"""
+        for car_name in ('A', 'B', 'C'):
+            self.create_project(car_name)
+        ProjectChange.objects.filter(id__lt=ProjectChange.objects.latest('id').id).delete()
+
+        response = self.client.get(self.url, {'since': self.cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_import_writes_change_log(self):
+        """Test that bulk imports are visible in the change feed"""
+        path = Path(tempfile.mkdtemp()) / 'projects.ndjson'
+        path.write_text('{"car_name": "Volvo"}\n{"car_name": "Saab"}\n', encoding='utf-8')
+        call_command('import_projects', str(path), stdout=io.StringIO())
+
+        response = self.client.get(self.url, {'since': self.cursor})
+
+        self.assertEqual(len(response.data['changes']), 2)
+
+    def test_stream_requires_asgi(self):
+        """Test that the SSE stream refuses to run under WSGI"""
+        response = self.client.get(reverse('project-change-stream'))
+
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    async def test_stream_sends_changes(self):
+        """Test that the SSE stream emits an event for each change after the cursor"""
+        project = await Project.objects.acreate(car_name='Volvo')
+
+        response = await self.async_client.get(
+            reverse('project-change-stream'), headers={'Last-Event-ID': str(self.cursor)}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = response.streaming_content
+        self.assertEqual(await anext(events), b'retry: 5000\n\n')
+        event = (await anext(events)).decode()
+        await events.aclose()
+
+        self.assertIn('event: change', event)
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(data['id'], project.pk)
+        self.assertEqual(data['action'], 'created')
+
+
+class ProjectAdminTests(TestCase):
+    """
+    Test suite for the Project admin changelist and its bulk actions.
+    """
+
+    def setUp(self):
+        """Log in as a superuser and create a few projects"""
+        self.user = make_user(is_staff=True, is_superuser=True)
+        self.client.force_login(self.user)
+        self.url = reverse('admin:projects_project_changelist')
+        stats.rebuild()
+        self.projects = make_projects(4, price=lambda i: 10000 * (i + 1), is_active=lambda i: i % 2 == 0)
+
+    def post_action(self, action, projects, **data):
+        return self.client.post(self.url, {
+            'action': action,
+            '_selected_action': [project.pk for project in projects],
+            **data,
+        }, follow=True)
+
+    def assert_stats_consistent(self):
+        incremental = stats.read()
+        stats.rebuild()
+        self.assertEqual(incremental, stats.read())
+
+    def test_changelist_never_counts_the_whole_table(self):
+        """Test that the changelist renders without a full COUNT(*)"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'Car 3')
+        counts = [q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()]
+        self.assertEqual(counts, [])
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+    def test_filtered_changelist_count_is_bounded(self):
+        """Test that filtered lists are counted with a LIMIT"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'is_active__exact': '1'})
+
+        self.assertEqual(response.context['cl'].result_count, 2)
+        counts = [q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT 10000', counts[0])
+
+    def test_activate_and_deactivate(self):
+        """Test that activate/deactivate update only rows that change, with stats and change log"""
+        changes_before = ProjectChange.objects.count()
+
+        response = self.post_action('activate', self.projects)
+        self.assertContains(response, '2 project(s) activated.')
+        self.assertEqual(Project.objects.filter(is_active=True).count(), 4)
+        self.assertEqual(ProjectChange.objects.count(), changes_before + 2)
+        self.assert_stats_consistent()
+
+        self.post_action('deactivate', self.projects[:3])
+        self.assertEqual(list(Project.objects.filter(is_active=True)), [self.projects[3]])
+        self.assert_stats_consistent()
+
+    def test_reprice_is_a_single_update(self):
+        """Test that reprice changes every selected price with one UPDATE"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_action('reprice', self.projects[:2], percent='15')
+
+        self.assertContains(response, '2 project(s) repriced.')
+        prices = list(Project.objects.order_by('pk').values_list('price', flat=True))
+        self.assertEqual(prices, [11500, 23000, 30000, 40000])
+        project_updates = [q['sql'] for q in queries.captured_queries
+                           if q['sql'].startswith('UPDATE "projects_project"')]
+        self.assertEqual(len(project_updates), 1)
+        self.assert_stats_consistent()
+
+    def test_reprice_requires_percentage(self):
+        """Test that reprice without a percentage changes nothing"""
+        response = self.post_action('reprice', self.projects, percent='')
+
+        self.assertContains(response, 'Enter a price change')
+        self.assertEqual(Project.objects.get(pk=self.projects[0].pk).price, 10000)
+
+    def test_date_hierarchy_walks_the_index(self):
+        """Test that date drill-down finds the same periods without a DISTINCT scan"""
+        for project, created in zip(self.projects, ['2024-03-05', '2024-03-20', '2024-07-01', '2025-01-15']):
+            Project.objects.filter(pk=project.pk).update(created_at=f'{created}T12:00:00Z')
+        queryset = ProjectAdmin(Project, admin.site).get_queryset(None)
+
+        for kind in ('year', 'month', 'day'):
+            self.assertEqual(list(queryset.datetimes('created_at', kind)),
+                             list(Project.objects.datetimes('created_at', kind)))
+        self.assertEqual(list(queryset.filter(is_active=True).datetimes('created_at', 'month', order='DESC')),
+                         list(Project.objects.filter(is_active=True).datetimes('created_at', 'month', order='DESC')))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'created_at__year': '2024'})
+        self.assertContains(response, 'July')
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'DISTINCT' in q['sql'].upper()])
@@ -1,7 +1,18 @@
 from django.urls import path
-from .views import ProjectListCreate, ProjectDetail
+from .views import (
+    ProjectListCreate,
+    ProjectDetail,
+    ProjectExport,
+    ProjectStats,
+    ProjectChanges,
+    project_change_stream,
+)
 
 urlpatterns = [
     path("projects/", ProjectListCreate.as_view(), name="project-list-create"),
     path("projects/<int:pk>/", ProjectDetail.as_view(), name="project-detail"),
+    path("projects/export.<str:fmt>", ProjectExport.as_view(), name="project-export"),
+    path("projects/stats/", ProjectStats.as_view(), name="project-stats"),
+    path("projects/changes/", ProjectChanges.as_view(), name="project-changes"),
+    path("projects/changes/stream/", project_change_stream, name="project-change-stream"),
 ]
\ No newline at end of file
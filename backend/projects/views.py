@@ -1,11 +1,24 @@
+import asyncio
+import csv
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from rest_framework import serializers
+from rest_framework.negotiation import BaseContentNegotiation
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 
+from . import changes, stats
+from .spreadsheet import escape_cell
 from .models import Project
 from .serializers import ProjectSerializer
+from backend.renderers import FastJSONRenderer
 
 
 class ProjectListCreate(APIView):
@@ -16,9 +29,12 @@ class ProjectListCreate(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get(self, request):
+        # Read the cursor first: changes made while the list is built are
+        # sent again by the change feed rather than lost
+        cursor = changes.latest_cursor()
         queryset = Project.objects.all().order_by("-created_at")
         serializer = ProjectSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK, headers={"X-Change-Cursor": str(cursor)})
 
     def post(self, request):
         serializer = ProjectSerializer(data=request.data)
@@ -64,4 +80,196 @@ class ProjectDetail(APIView):
     def delete(self, request, pk: int):
         project = self.get_object(pk)
         project.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProjectStats(APIView):
+    """
+    GET /api/projects/stats/ -> counts, active/inactive split, price min/max/avg
+                                and price histogram (public)
+
+    Served from precomputed counters (see stats.py), not a table scan, and
+    cached between project writes.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        return Response(stats.cached_read(), status=status.HTTP_200_OK)
+
+
+def _parse_cursor(value):
+    """Return a non-negative int cursor, or None if ``value`` isn't one."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor >= 0 else None
+
+
+class ProjectChanges(APIView):
+    """
+    GET /api/projects/changes/?since=<cursor> -> projects changed after <cursor> (public)
+
+    Start from the X-Change-Cursor header of GET /api/projects/, then pass the
+    returned "cursor" back as ?since= on the next poll. Each changed project
+    appears once, with its current data ("project" is null once deleted).
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        since = _parse_cursor(request.query_params.get("since"))
+        if since is None:
+            return Response(
+                {"error": "since must be a cursor (a non-negative integer)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            cursor, changed, more = changes.changes_since(since, settings.PROJECT_CHANGES_PAGE_SIZE)
+        except changes.CursorExpired:
+            return Response(
+                {"error": "Cursor is too old. Reload /api/projects/ and use its X-Change-Cursor."},
+                status=status.HTTP_410_GONE,
+            )
+
+        return Response({"cursor": cursor, "changes": changed, "more": more}, status=status.HTTP_200_OK)
+
+
+async def project_change_stream(request):
+    """
+    GET /api/projects/changes/stream/ -> server-sent events, one per project change (public)
+
+    Resumes from the Last-Event-ID header or ?since=<cursor>, otherwise starts
+    at the newest change. Only served by the ASGI app: under WSGI an open
+    stream would tie up a whole sync worker.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "The change stream needs the ASGI app. Poll /api/projects/changes/?since=<cursor> instead."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    if since is None:
+        since = await sync_to_async(changes.latest_cursor)()
+    else:
+        since = _parse_cursor(since)
+        if since is None:
+            return JsonResponse(
+                {"error": "since must be a cursor (a non-negative integer)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    response = StreamingHttpResponse(_change_events(since), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # tell nginx not to buffer the stream
+    return response
+
+
+async def _change_events(since):
+    yield "retry: 5000\n\n"
+    idle = 0.0
+
+    while True:
+        try:
+            since, changed, more = await sync_to_async(changes.changes_since)(
+                since, settings.PROJECT_CHANGES_PAGE_SIZE
+            )
+        except changes.CursorExpired:
+            yield "event: reset\ndata: {}\n\n"
+            return
+
+        for change in changed:
+            yield changes.format_event(change)
+
+        if changed:
+            idle = 0.0
+        if more:
+            continue
+
+        await asyncio.sleep(settings.PROJECT_CHANGES_POLL_INTERVAL)
+        idle += settings.PROJECT_CHANGES_POLL_INTERVAL
+        if idle >= settings.PROJECT_CHANGES_HEARTBEAT:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    Always use the first renderer. Streaming views build their own response,
+    so an Accept header like "text/csv" must not turn into a 406.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+class ProjectExport(APIView):
+    """
+    GET /api/projects/export.csv    -> all projects as CSV (public)
+    GET /api/projects/export.ndjson -> all projects as newline-delimited JSON (public)
+
+    Rows are read with .iterator() and streamed in chunks, so memory use and
+    time-to-first-byte don't grow with the size of the table.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    content_negotiation_class = IgnoreClientContentNegotiation
+    fields = ProjectSerializer.Meta.fields
+    content_types = {
+        "csv": "text/csv; charset=utf-8",
+        "ndjson": "application/x-ndjson",
+    }
+
+    def get(self, request, fmt: str):
+        if fmt not in self.content_types:
+            return Response(
+                {"error": f"Unsupported export format '{fmt}'. Use csv or ndjson."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        chunks = self._csv_chunks() if fmt == "csv" else self._ndjson_chunks()
+        response = StreamingHttpResponse(chunks, content_type=self.content_types[fmt])
+        response["Content-Disposition"] = f'attachment; filename="projects.{fmt}"'
+        return response
+
+    def _rows(self):
+        """Yield each project as a dict, formatted the same way as the JSON API."""
+        # Same datetime format as ProjectSerializer (local time zone, ISO 8601)
+        datetime_field = serializers.DateTimeField()
+        queryset = Project.objects.order_by("id").values_list(*self.fields)
+
+        for values in queryset.iterator(chunk_size=settings.PROJECT_EXPORT_CHUNK_SIZE):
+            row = dict(zip(self.fields, values))
+            row["created_at"] = datetime_field.to_representation(row["created_at"])
+            row["updated_at"] = datetime_field.to_representation(row["updated_at"])
+            yield row
+
+    def _csv_chunks(self):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.fields)
+        writer.writeheader()
+
+        for count, row in enumerate(self._rows(), start=1):
+            writer.writerow({name: escape_cell(value) for name, value in row.items()})
+            if count % settings.PROJECT_EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
+    def _ndjson_chunks(self):
+        renderer = FastJSONRenderer()
+        lines = []
+
+        for row in self._rows():
+            lines.append(renderer.render(row))
+            if len(lines) == settings.PROJECT_EXPORT_CHUNK_SIZE:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+
+        if lines:
+            yield b"\n".join(lines) + b"\n"
\ No newline at end of file
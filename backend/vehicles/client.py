@@ -0,0 +1,278 @@
+"""
+HTTP client for the Statens Vegvesen kjoretoydata API.
+
+A single ``requests.Session`` is shared per worker process so TCP/TLS
+connections to the upstream are kept alive between lookups.
+
+``VEGVESEN_CLIENT_MODE`` selects where responses come from:
+- ``live``: the real API (default)
+- ``record``: the real API, and every response is saved to the corpus
+- ``replay``: the recorded corpus only, no network (see corpus.py). Replay
+  answers any plate with some recorded document, so the lookup view stores
+  nothing (EU control deadlines, cached 404s) from replayed responses
+
+Live timeouts follow the latencies this worker has recently seen, and slow
+lookups can optionally be hedged with a second request (see latency.py and
+the VEGVESEN_TIMEOUT* / VEGVESEN_HEDGE_* settings).
+
+Every lookup is traced (backend/tracing.py): a ``vegvesen.lookup`` span with
+the outcome, and a ``vegvesen.request`` span per HTTP request with its DNS,
+connect, TLS, wait and download times and the response size. Requests are
+also logged with the trace id of the API request that made them.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import requests
+from django.conf import settings
+
+from backend import tracing
+
+from .corpus import get_corpus
+from .latency import HedgeBudget, LatencyWindow
+
+VEGVESEN_API_URL = 'https://akfell-datautlevering.atlas.vegvesen.no/enkeltoppslag/kjoretoydata'
+
+logger = logging.getLogger(__name__)
+
+# Connection pools are filled lazily, so with preload_app the master process
+# never holds sockets that forked workers would end up sharing.
+session = requests.Session()
+session.mount('https://', tracing.TracingHTTPAdapter())
+session.mount('http://', tracing.TracingHTTPAdapter())
+
+latency_window = LatencyWindow(settings.VEGVESEN_LATENCY_WINDOW)
+hedge_budget = HedgeBudget(settings.VEGVESEN_HEDGE_RATIO, settings.VEGVESEN_HEDGE_BURST)
+
+# Runs the primary and hedge request of hedged lookups. Created on first use,
+# so it only ever exists in workers, never in the preloading master. Requests
+# only go in when a thread is free (_free_threads), so they never queue.
+_executor = None
+_free_threads = None
+_executor_lock = threading.Lock()
+
+
+def reset_latency_stats():
+    """Forget recorded latencies and refill the hedge budget (used by tests)."""
+    latency_window.clear()
+    hedge_budget.reset()
+
+
+def is_replaying():
+    """True when responses come from the recorded corpus, not the upstream."""
+    return settings.VEGVESEN_CLIENT_MODE == 'replay'
+
+
+def current_timeout():
+    """Timeout (seconds) for the next upstream call, from recent latencies."""
+    if len(latency_window) < settings.VEGVESEN_LATENCY_MIN_SAMPLES:
+        return settings.VEGVESEN_TIMEOUT
+    timeout = latency_window.percentile(99) * settings.VEGVESEN_TIMEOUT_MULTIPLIER
+    return round(min(max(timeout, settings.VEGVESEN_TIMEOUT_MIN), settings.VEGVESEN_TIMEOUT), 3)
+
+
+def hedge_delay():
+    """Seconds to wait before hedging, or None while hedging is off or unwarmed."""
+    if not settings.VEGVESEN_HEDGE_ENABLED:
+        return None
+    if len(latency_window) < settings.VEGVESEN_LATENCY_MIN_SAMPLES:
+        return None
+    return latency_window.percentile(95)
+
+
+def _get_executor():
+    global _executor, _free_threads
+    with _executor_lock:
+        if _executor is None:
+            size = settings.VEGVESEN_HEDGE_THREADS
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='vegvesen-hedge')
+            _free_threads = threading.BoundedSemaphore(size)
+        return _executor
+
+
+def _submit(*args):
+    """Run ``_timed_get(*args)`` on a free executor thread; None if all are busy."""
+    executor = _get_executor()
+    if not _free_threads.acquire(blocking=False):
+        return None
+    try:
+        future = executor.submit(_timed_get, *args)
+    except BaseException:
+        # e.g. shut down at interpreter exit: the permit was never handed to a thread
+        _free_threads.release()
+        raise
+    future.add_done_callback(lambda _: _free_threads.release())
+    return future
+
+
+def _close_response(future):
+    # The loser's response is never read: give its connection back to the pool
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _body_size(response):
+    # Already downloaded (no stream=True), so this reads nothing
+    content = response.content
+    return len(content) if isinstance(content, bytes) else None
+
+
+def _timed_get(headers, params, timeout, context=None, attempt='primary'):
+    """
+    GET the upstream, add the observed latency to the window and export a
+    span with the time spent in each phase.
+    """
+    span = tracing.Span('vegvesen.request', context, **{
+        'http.method': 'GET',
+        'http.url': VEGVESEN_API_URL,
+        'http.timeout_s': timeout,
+        'request.attempt': attempt,
+    })
+    started = time.monotonic()
+    with tracing.http_phases() as phases:
+        try:
+            response = session.get(VEGVESEN_API_URL, headers=headers, params=params, timeout=timeout)
+        except requests.RequestException as e:
+            if isinstance(e, requests.Timeout):
+                # Count the timeout itself, so the window widens after slow spells
+                latency_window.record(timeout)
+            span.set(**phases.as_attributes())
+            span.finish(error=e)
+            logger.warning('Vegvesen %s request failed after %.0f ms: %s', attempt, span.duration * 1000, e)
+            raise
+    latency_window.record(time.monotonic() - started)
+
+    download_ms = (time.perf_counter() - phases.headers_at) * 1000 if phases.headers_at else 0.0
+    span.set(**phases.as_attributes(), **{
+        'timing.download_ms': round(download_ms, 2),
+        'http.status_code': response.status_code,
+        'http.response.size': _body_size(response),
+    })
+    span.finish()
+    logger.info(
+        'Vegvesen %s request: %s in %.0f ms (dns %.0f, connect %.0f, tls %.0f, wait %.0f, download %.0f ms), %s bytes%s',
+        attempt, response.status_code, span.duration * 1000, phases.dns_ms, phases.connect_ms,
+        phases.tls_ms, phases.wait_ms, download_ms, span.attributes['http.response.size'],
+        '' if phases.connection_reused else ', new connection',
+    )
+    return response
+
+
+def _hedged_get(headers, params, timeout, delay, span):
+    """
+    Send the request; if it hasn't answered within ``delay``, send a second one.
+
+    Returns the first response to arrive. If one request fails, the other is
+    still awaited; the error is only raised when both fail. The losing
+    request finishes in the background and its response is closed. When no
+    executor thread is free (losers of earlier lookups still running), the
+    lookup isn't hedged rather than waiting for one. The outcome is recorded
+    on the lookup ``span``.
+    """
+    primary = _submit(headers, params, timeout, span.context, 'primary')
+    if primary is None:
+        span.set(**{'request.hedge_skipped': 'no free thread'})
+        return _timed_get(headers, params, timeout, span.context)
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeoutError:
+        pass
+
+    if not hedge_budget.withdraw():
+        span.set(**{'request.hedge_skipped': 'budget'})
+        return primary.result()
+    hedge = _submit(headers, params, timeout, span.context, 'hedge')
+    if hedge is None:
+        span.set(**{'request.hedge_skipped': 'no free thread'})
+        return primary.result()
+
+    span.set(**{'request.attempts': 2})
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                span.set(**{'request.winner': 'primary' if future is primary else 'hedge'})
+                for loser in pending:
+                    loser.add_done_callback(_close_response)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _fetch_live(registration, headers, params, timeout, span):
+    if timeout is None:
+        timeout = current_timeout()
+
+    hedge_budget.deposit()
+    delay = hedge_delay()
+    span.set(**{'request.attempts': 1, 'http.timeout_s': timeout, 'request.hedge_delay_s': delay})
+    if delay is None:
+        response = _timed_get(headers, params, timeout, span.context)
+    else:
+        response = _hedged_get(headers, params, timeout, delay, span)
+
+    if settings.VEGVESEN_CLIENT_MODE == 'record':
+        get_corpus(settings.VEGVESEN_CORPUS_DIR).record(registration, response)
+    return response
+
+
+def fetch_vehicle(registration, api_key, timeout=None):
+    """
+    Call the kjoretoydata endpoint for one registration number.
+
+    ``timeout`` defaults to ``current_timeout()``.
+    """
+    headers = {
+        'SVV-Authorization': f'Apikey {api_key}'
+    }
+    params = {
+        'kjennemerke': registration
+    }
+
+    span = tracing.Span('vegvesen.lookup', **{
+        'vehicle.registration': registration,
+        'client.mode': settings.VEGVESEN_CLIENT_MODE,
+        'cache.outcome': 'miss',
+    })
+    try:
+        if is_replaying():
+            corpus = get_corpus(settings.VEGVESEN_CORPUS_DIR)
+            response = corpus.replay(registration, latency_scale=settings.VEGVESEN_REPLAY_LATENCY_SCALE)
+            span.set(**{'request.attempts': 0})
+        else:
+            response = _fetch_live(registration, headers, params, timeout, span)
+        span.set(**{'http.status_code': response.status_code})
+    except Exception as e:
+        span.finish(error=e)
+        raise
+    span.finish()
+    return response
+
+
+def record_cache_hit(registration):
+    """Trace a lookup answered from the not-found cache, without an upstream call."""
+    tracing.Span('vegvesen.lookup', **{
+        'vehicle.registration': registration,
+        'client.mode': settings.VEGVESEN_CLIENT_MODE,
+        'cache.outcome': 'hit',
+        'request.attempts': 0,
+    }).finish()
+
+
+def warm_up_connection(timeout=2):
+    """
+    Open a pooled TCP/TLS connection to the upstream host ahead of the first lookup.
+
+    Sends a HEAD request without the API key. Errors are ignored; the next
+    real lookup simply opens its own connection.
+    """
+    try:
+        session.head(VEGVESEN_API_URL, timeout=timeout)
+    except requests.RequestException:
+        pass
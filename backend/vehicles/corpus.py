@@ -0,0 +1,141 @@
+"""
+Recorded Statens Vegvesen responses for offline replay and benchmarks.
+
+In ``record`` mode every upstream response is saved (with personal data
+scrubbed) as ``<REGISTRATION>.json`` in ``VEGVESEN_CORPUS_DIR``. In
+``replay`` mode lookups are answered from those files, after sleeping for a
+latency drawn from the recorded latencies, and the network is never used.
+"""
+
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import requests
+from django.utils import timezone
+
+# Keys whose values are replaced before a response is written to disk
+SENSITIVE_KEYS = {
+    'understellsnummer',
+    'eier',
+    'eierskap',
+    'leasingtaker',
+    'medeier',
+    'navn',
+    'adresse',
+    'postadresse',
+    'fodselsdato',
+    'organisasjonsnummer',
+}
+REDACTED = 'REDACTED'
+
+
+def scrub(value):
+    """Return a copy of a decoded JSON document with sensitive fields redacted."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key.lower() in SENSITIVE_KEYS else scrub(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    return value
+
+
+class UpstreamCorpus:
+    """A directory of recorded upstream responses, one JSON file per registration."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._entries = None
+
+    def record(self, registration, response):
+        """Save one upstream response (status, scrubbed body, latency)."""
+        if not registration.isalnum():
+            # Only plain plates become file names
+            return
+
+        try:
+            body = scrub(response.json())
+            text = None
+        except ValueError:
+            body = None
+            text = response.text
+
+        entry = {
+            'registration': registration,
+            'status_code': response.status_code,
+            'latency_ms': round(response.elapsed.total_seconds() * 1000, 1),
+            'recorded_at': timezone.now().isoformat(),
+            'body': body,
+            'text': text,
+        }
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename, so concurrent workers never leave
+        # a half-written file behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self.directory / f'{registration}.json')
+        self._entries = None
+
+    def entries(self):
+        """All recorded entries, keyed by registration (loaded once)."""
+        if self._entries is None:
+            entries = {}
+            for path in sorted(self.directory.glob('*.json')):
+                entry = json.loads(path.read_text(encoding='utf-8'))
+                entries[entry['registration']] = entry
+            self._keys = sorted(entries)
+            self._latencies = [entry['latency_ms'] / 1000 for entry in entries.values()]
+            self._entries = entries
+        return self._entries
+
+    def replay(self, registration, latency_scale=1.0):
+        """
+        Build a ``requests.Response`` for ``registration`` from the corpus.
+
+        Unknown registrations are mapped onto a recorded one by a stable hash,
+        so load tests can use any plates. Sleeps for a latency sampled from
+        all recorded latencies, times ``latency_scale`` (0 = no delay).
+        """
+        entries = self.entries()
+        if not entries:
+            raise requests.ConnectionError(f'Upstream corpus {self.directory} is empty')
+
+        entry = entries.get(registration)
+        if entry is None:
+            digest = hashlib.blake2b(registration.encode(), digest_size=4).digest()
+            entry = entries[self._keys[int.from_bytes(digest, 'big') % len(self._keys)]]
+
+        latency = random.choice(self._latencies) * latency_scale
+        if latency > 0:
+            time.sleep(latency)
+
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response.encoding = 'utf-8'
+        response.elapsed = timedelta(seconds=latency)
+        if entry['body'] is not None:
+            response._content = json.dumps(entry['body'], ensure_ascii=False).encode('utf-8')
+            response.headers['Content-Type'] = 'application/json'
+        else:
+            response._content = (entry['text'] or '').encode('utf-8')
+        return response
+
+
+_corpora = {}
+
+
+def get_corpus(directory):
+    """Return the (cached) corpus for ``directory``."""
+    key = str(directory)
+    if key not in _corpora:
+        _corpora[key] = UpstreamCorpus(directory)
+    return _corpora[key]
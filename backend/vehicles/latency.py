@@ -0,0 +1,71 @@
+"""
+Rolling upstream latency statistics, used to size timeouts and hedge delays.
+
+Each gunicorn worker keeps its own window of recent Statens Vegvesen
+latencies. Until the window holds ``VEGVESEN_LATENCY_MIN_SAMPLES`` samples
+the client falls back to the fixed ``VEGVESEN_TIMEOUT``.
+"""
+
+import math
+import threading
+from collections import deque
+
+
+class LatencyWindow:
+    """The last ``size`` latencies (seconds), with nearest-rank percentiles."""
+
+    def __init__(self, size):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent):
+        """Return the ``percent`` percentile, or None if there are no samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(math.ceil(len(samples) * percent / 100), 1)
+        return samples[rank - 1]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedged requests to a fraction of all lookups.
+
+    Every lookup adds ``ratio`` tokens (up to ``burst``) and every hedge
+    spends one, so at most ``ratio`` extra upstream calls are made per lookup
+    over time and the API quota grows by that fraction at worst.
+    """
+
+    def __init__(self, ratio, burst):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend one token; False if the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._tokens = self.burst
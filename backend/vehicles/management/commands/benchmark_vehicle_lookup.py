@@ -0,0 +1,96 @@
+import statistics
+import time
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from vehicles.corpus import get_corpus
+from vehicles.views import VehicleLookupView
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark vehicle lookups against the recorded upstream corpus "
+        "(VEGVESEN_CORPUS_DIR), without network access: response parsing in "
+        "_extract_vehicle_data, then end-to-end GET /api/vehicles/lookup/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=1000,
+            help="Extractions / lookups to run in each phase (default: 1000)",
+        )
+        parser.add_argument(
+            "--latency-scale", type=float, default=0.0,
+            help="Multiplier for the recorded upstream latencies (default: 0, no delay)",
+        )
+        parser.add_argument(
+            "--corpus", default=settings.VEGVESEN_CORPUS_DIR,
+            help="Corpus directory (default: VEGVESEN_CORPUS_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        if iterations < 1:
+            raise CommandError("--iterations must be at least 1")
+        corpus = get_corpus(options["corpus"])
+        entries = corpus.entries()
+        if not entries:
+            raise CommandError(
+                f"No recorded responses in {corpus.directory}. "
+                "Run with VEGVESEN_CLIENT_MODE=record first."
+            )
+
+        self.stdout.write(f"Corpus: {len(entries)} responses from {corpus.directory}")
+        self._benchmark_extraction(entries, iterations)
+        self._benchmark_lookups(entries, iterations, options)
+
+    def _benchmark_extraction(self, entries, iterations):
+        documents = [entry["body"] for entry in entries.values()
+                     if entry["status_code"] == 200 and entry["body"] is not None]
+        if not documents:
+            self.stdout.write("Extraction: skipped (no successful responses in the corpus)")
+            return
+
+        view = VehicleLookupView()
+        started = time.perf_counter()
+        for document in islice(cycle(documents), iterations):
+            view._extract_vehicle_data(document)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Extraction: {iterations} documents in {elapsed:.3f}s "
+            f"({elapsed / iterations * 1e6:.1f} µs/document)"
+        )
+
+    def _benchmark_lookups(self, entries, iterations, options):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        url = reverse("vehicle-lookup")
+        plates = list(entries)
+        timings = []
+
+        replay_settings = override_settings(
+            VEGVESEN_CLIENT_MODE="replay",
+            VEGVESEN_CORPUS_DIR=options["corpus"],
+            VEGVESEN_REPLAY_LATENCY_SCALE=options["latency_scale"],
+            STATENS_VEGVESEN_API_KEY=settings.STATENS_VEGVESEN_API_KEY or "replay",
+        )
+        # Replayed lookups store nothing (no deadlines, no cached 404s)
+        with replay_settings:
+            started = time.perf_counter()
+            for plate in islice(cycle(plates), iterations):
+                request_started = time.perf_counter()
+                client.get(url, {"registration": plate})
+                timings.append(time.perf_counter() - request_started)
+            elapsed = time.perf_counter() - started
+
+        timings.sort()
+        p50 = statistics.median(timings) * 1000
+        p95 = timings[int(len(timings) * 0.95) - 1] * 1000 if len(timings) >= 20 else timings[-1] * 1000
+        self.stdout.write(
+            f"Lookups: {iterations} in {elapsed:.3f}s ({iterations / elapsed:,.0f} req/s), "
+            f"p50 {p50:.2f} ms, p95 {p95:.2f} ms"
+        )
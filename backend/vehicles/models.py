@@ -1,3 +1,20 @@
 from django.db import models
 
-# Create your models here.
+
+class EuControlDeadline(models.Model):
+    """
+    Next EU control (periodisk kjøretøykontroll) deadline per registration,
+    saved from upstream lookups so due dates can be queried locally.
+    """
+    registration = models.CharField(max_length=10, unique=True)
+    due_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Range scans on due_date, already in (due_date, registration) order
+            models.Index(fields=["due_date", "registration"], name="eu_control_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.registration} ({self.due_date})"
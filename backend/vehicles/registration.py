@@ -0,0 +1,75 @@
+"""
+Registration number normalisation and validation, done before any upstream call.
+
+``normalize`` turns user input into the canonical plate ("ab 12-345" ->
+"AB12345"), which is also the key for the not-found cache, the EU control
+deadline table and the recorded corpus. Plates that can't be Norwegian, and
+plates the upstream recently answered 404 for, are answered locally.
+"""
+
+import re
+
+from django.conf import settings
+
+from backend import cache
+
+# Spaces and hyphens users type between the letters and digits
+_SEPARATORS = re.compile(r'[\s\-]+')
+
+MIN_LENGTH = 2
+MAX_LENGTH = 7
+
+_UPPERCASE = str.maketrans('abcdefghijklmnopqrstuvwxyzæøå', 'ABCDEFGHIJKLMNOPQRSTUVWXYZÆØÅ')
+
+# Ordinary plates: two letters, then four or five digits without a leading
+# zero (EL1234, AB12345)
+ORDINARY_PLATE = re.compile(r'[A-Z]{2}[1-9][0-9]{3,4}')
+
+# Personalised plates: 2-7 letters (including ÆØÅ) and digits, with at least
+# one letter, and never in the ordinary two-letters-then-digits layout
+PERSONALISED_PLATE = re.compile(rf'(?=[0-9]*[A-ZÆØÅ])[A-ZÆØÅ0-9]{{{MIN_LENGTH},{MAX_LENGTH}}}')
+_ORDINARY_LAYOUT = re.compile(r'[A-Z]{2}[0-9]{4,5}')
+
+INVALID_MESSAGE = (
+    f'Registration number must be between {MIN_LENGTH} and {MAX_LENGTH} characters: '
+    'two letters and 4-5 digits, or a personalised plate of letters and digits'
+)
+
+
+def normalize(raw):
+    """
+    Uppercase and drop spaces/hyphens. Only the letters a plate can have are
+    uppercased, one for one, so anything else (ß, ä, ...) is kept as typed
+    and fails ``is_valid`` instead of turning into another plate (ß -> SS).
+    """
+    return _SEPARATORS.sub('', raw).translate(_UPPERCASE)
+
+
+def is_valid(registration):
+    """True if a normalised registration can be a Norwegian plate."""
+    if ORDINARY_PLATE.fullmatch(registration):
+        return True
+    return (PERSONALISED_PLATE.fullmatch(registration) is not None
+            and _ORDINARY_LAYOUT.fullmatch(registration) is None)
+
+
+def is_known_missing(registration):
+    """
+    True if the upstream answered 404 for this plate within the cache TTL.
+
+    Only 404s are cached, so a plate that exists misses the local tier and
+    reads the shared one every time, just before the upstream call it makes anyway.
+    """
+    return cache.namespace('vehicles').get(f'not-found:{registration}', False)
+
+
+def remember_missing(registration):
+    """Remember a 404 for every worker on the host."""
+    cache.namespace('vehicles').set(
+        f'not-found:{registration}', True, timeout=settings.VEHICLE_NOT_FOUND_CACHE_TTL
+    )
+
+
+def clear_not_found_cache():
+    """Forget all cached 404s (used by tests)."""
+    cache.namespace('vehicles').clear()
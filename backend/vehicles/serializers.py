@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from .models import EuControlDeadline
+
+class EuControlDeadlineSerializer(serializers.ModelSerializer):
+    nextEuApproval = serializers.DateField(source="due_date")
+
+    class Meta:
+        model = EuControlDeadline
+        fields = ["registration", "nextEuApproval"]
@@ -1,10 +1,29 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from unittest.mock import patch, Mock
+from datetime import timedelta
+from django.utils import timezone
+import io
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
 
+from backend import tracing
+from backend.factories import make_user, upstream_response, vehicle_payload
+from . import client as vegvesen_client
+from . import registration as registration_numbers
+from .corpus import get_corpus
+from .models import EuControlDeadline
+
 
 class VehicleLookupViewTests(TestCase):
     """
@@ -15,37 +34,17 @@ class VehicleLookupViewTests(TestCase):
     def setUp(self):
         """Set up test client and common test data"""
         self.client = APIClient()
+        vegvesen_client.reset_latency_stats()
+        registration_numbers.clear_not_found_cache()
         self.url = reverse('vehicle-lookup')  # Assumes URL name is 'vehicle-lookup'
         self.valid_registration = 'AB12345'
         self.api_url = 'https://akfell-datautlevering.atlas.vegvesen.no/enkeltoppslag/kjoretoydata'
 
         # Sample successful API response
-        self.mock_success_response = {
-            'kjennemerke': 'AB12345',
-            'kjoretoydataListe': [{
-                'kjennemerke': {'kjennemerke': 'AB12345'},
-                'godkjenning': {
-                    'tekniskGodkjenning': {
-                        'tekniskeData': {
-                            'generelt': {
-                                'merke': {'merke': 'Toyota'},
-                                'handelsbetegnelse': 'Corolla',
-                                'aarsmodell': '2020'
-                            }
-                        }
-                    }
-                },
-                'periodiskKjoretoyKontroll': {
-                    'kontrollfrist': '2025-12-31'
-                },
-                'forstegangsregistrering': {
-                    'registrertForstegangNorgeDato': '2020-01-15'
-                }
-            }]
-        }
+        self.mock_success_response = vehicle_payload()
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_valid_registration_number_success(self, mock_get):
         """Test successful lookup with valid registration number"""
         # Mock successful API response
@@ -74,7 +73,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertEqual(call_args[1]['timeout'], 10)
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_invalid_registration_number_404(self, mock_get):
         """Test lookup with non-existent registration number returns proper error"""
         # Mock 404 response from API
@@ -124,7 +123,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertIn('between 2 and 7 characters', response.data['error'])
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_api_400_bad_request(self, mock_get):
         """Test handling of 400 error from external API"""
         mock_response = Mock()
@@ -138,7 +137,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertIn('Invalid registration number', response.data['error'])
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'invalid-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_api_403_forbidden(self, mock_get):
         """Test handling of 403 error (invalid API key)"""
         mock_response = Mock()
@@ -152,7 +151,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertIn('API key', response.data['error'])
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_api_429_rate_limit(self, mock_get):
         """Test handling of 429 error (rate limit exceeded)"""
         mock_response = Mock()
@@ -167,7 +166,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertIn('50,000', response.data['error'])
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_api_timeout(self, mock_get):
         """Test handling of request timeout"""
         mock_get.side_effect = requests.Timeout('Connection timeout')
@@ -179,7 +178,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertIn('timed out', response.data['error'].lower())
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_api_connection_error(self, mock_get):
         """Test handling of connection error"""
         mock_get.side_effect = requests.RequestException('Connection failed')
@@ -200,7 +199,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertEqual(response.data['error'], 'API key not configured')
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_opplysninger_ikke_tilgjengelige_error(self, mock_get):
         """Test handling of OPPLYSNINGER_IKKE_TILGJENGELIGE error"""
         mock_response = Mock()
@@ -215,7 +214,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertEqual(response.data['error'], 'Vehicle information not available')
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_empty_kjoretoydataliste(self, mock_get):
         """Test handling of empty kjoretoydataListe in response"""
         mock_response = Mock()
@@ -234,7 +233,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertEqual(response.data['year'], 'N/A')
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_registration_number_case_insensitive(self, mock_get):
         """Test that registration number is converted to uppercase"""
         mock_response = Mock()
@@ -251,7 +250,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_public_endpoint_no_auth_required(self, mock_get):
         """Test that endpoint is accessible without authentication"""
         mock_response = Mock()
@@ -266,7 +265,7 @@ class VehicleLookupViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
-    @patch('vehicles.views.requests.get')
+    @patch('vehicles.client.session.get')
     def test_data_extraction_with_minimal_response(self, mock_get):
         """Test data extraction with minimal API response structure"""
         mock_response = Mock()
@@ -290,3 +289,546 @@ class VehicleLookupViewTests(TestCase):
         # Should return N/A for missing fields
         self.assertEqual(response.data['brand'], 'N/A')
         self.assertEqual(response.data['model'], 'N/A')
+
+    @patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
+    @patch('vehicles.client.session.get')
+    def test_eu_control_deadline_is_stored(self, mock_get):
+        """Test that a successful lookup saves the next EU control date"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = self.mock_success_response
+        mock_get.return_value = mock_response
+
+        self.client.get(self.url, {'registration': 'ab12345'})
+        self.client.get(self.url, {'registration': 'AB12345'})
+
+        deadline = EuControlDeadline.objects.get()
+        self.assertEqual(deadline.registration, 'AB12345')
+        self.assertEqual(deadline.due_date.isoformat(), '2025-12-31')
+
+
+@patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
+class RegistrationNormalizationTests(TestCase):
+    """Test that plates are normalised and checked before the upstream is called"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('vehicle-lookup')
+        registration_numbers.clear_not_found_cache()
+        self.addCleanup(registration_numbers.clear_not_found_cache)
+
+    def test_normalize(self):
+        """Test spacing, hyphen and case variants map to one plate"""
+        for raw in ['AB12345', 'ab12345', ' ab 12345 ', 'AB-12345', 'Ab 12-345']:
+            self.assertEqual(registration_numbers.normalize(raw), 'AB12345')
+        self.assertEqual(registration_numbers.normalize('ølbil'), 'ØLBIL')
+
+    @patch('vehicles.client.session.get')
+    def test_spaced_plate_is_sent_normalised(self, mock_get):
+        """Test a plate typed with separators is looked up in canonical form"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'kjoretoydataListe': [{}]}
+        mock_get.return_value = mock_response
+
+        response = self.client.get(self.url, {'registration': 'ab 12-345'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get.call_args[1]['params']['kjennemerke'], 'AB12345')
+
+    @patch('vehicles.client.session.get')
+    def test_invalid_characters_rejected_locally(self, mock_get):
+        """Test plates with characters no Norwegian plate has never reach the upstream"""
+        for raw in ['AB12!45', 'AB_1234', 'ÄB12345']:
+            response = self.client.get(self.url, {'registration': raw})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('letters and digits', response.data['error'])
+        mock_get.assert_not_called()
+
+    def test_plate_formats(self):
+        """Test ordinary and personalised plates pass and malformed ones don't"""
+        for plate in ['AB12345', 'EL1234', 'ØLBIL', 'TESLA3', 'A1']:
+            self.assertTrue(registration_numbers.is_valid(plate), plate)
+        for plate in ['0000000', '12', 'AB01234', 'AB123456', 'A', 'STRAßE', 'ıNGE']:
+            self.assertFalse(registration_numbers.is_valid(plate), plate)
+
+    def test_normalize_keeps_the_length(self):
+        """Test characters whose uppercase is longer or foreign aren't folded into valid plates"""
+        self.assertEqual(registration_numbers.normalize('straße'), 'STRAßE')
+        self.assertEqual(registration_numbers.normalize('ınge'), 'ıNGE')
+
+    @patch('vehicles.client.session.get')
+    def test_not_found_is_cached(self, mock_get):
+        """Test a 404 is remembered and repeated lookups are answered locally"""
+        mock_response = Mock()
+        mock_response.status_code = 404
+        mock_get.return_value = mock_response
+
+        first = self.client.get(self.url, {'registration': 'XX99999'})
+        second = self.client.get(self.url, {'registration': 'xx 99-999'})
+
+        self.assertEqual(first.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(second.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(second.data, first.data)
+        mock_get.assert_called_once()
+
+    @override_settings(VEHICLE_NOT_FOUND_CACHE_TTL=-1)
+    @patch('vehicles.client.session.get')
+    def test_not_found_cache_expires(self, mock_get):
+        """Test expired 404s are looked up again"""
+        mock_response = Mock()
+        mock_response.status_code = 404
+        mock_get.return_value = mock_response
+
+        self.client.get(self.url, {'registration': 'XX99999'})
+        self.client.get(self.url, {'registration': 'XX99999'})
+
+        self.assertEqual(mock_get.call_count, 2)
+
+
+class EuControlDueViewTests(TestCase):
+    """
+    Test suite for the EU control "due soon" endpoint.
+    """
+
+    def setUp(self):
+        """Create deadlines around today; the feed is staff only"""
+        self.client = APIClient()
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.url = reverse('eu-control-due')
+        today = timezone.localdate()
+
+        EuControlDeadline.objects.bulk_create([
+            EuControlDeadline(registration='OVERDUE1', due_date=today - timedelta(days=1)),
+            EuControlDeadline(registration='SOON2', due_date=today + timedelta(days=10)),
+            EuControlDeadline(registration='SOON1', due_date=today + timedelta(days=2)),
+            EuControlDeadline(registration='LATER1', due_date=today + timedelta(days=90)),
+        ])
+
+    def test_requires_staff(self):
+        """Test that anonymous and non-staff callers can't list looked-up plates"""
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(make_user(username='driver'))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_due_within_default_window(self):
+        """Test that only deadlines in the next 30 days are returned, soonest first"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        registrations = [row['registration'] for row in response.data['results']]
+        self.assertEqual(registrations, ['SOON1', 'SOON2'])
+        self.assertIn('nextEuApproval', response.data['results'][0])
+
+    def test_custom_window(self):
+        """Test that the days parameter widens the window"""
+        response = self.client.get(self.url, {'days': 365})
+
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_pagination(self):
+        """Test that results are split into cursor pages"""
+        response = self.client.get(self.url, {'days': 365, 'page_size': 2})
+
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['registration'] for row in response.data['results']], ['LATER1'])
+
+    def test_overdue_excluded_by_default(self):
+        """Test that deadlines already passed are only listed with include_overdue"""
+        response = self.client.get(self.url, {'days': 365})
+        self.assertNotIn('OVERDUE1', [row['registration'] for row in response.data['results']])
+
+        response = self.client.get(self.url, {'days': 365, 'include_overdue': 'true'})
+        registrations = [row['registration'] for row in response.data['results']]
+        self.assertEqual(registrations, ['OVERDUE1', 'SOON1', 'SOON2', 'LATER1'])
+
+    def test_pagination_within_one_due_date(self):
+        """Test that the cursor continues by registration among rows sharing a date"""
+        due_date = timezone.localdate() + timedelta(days=5)
+        EuControlDeadline.objects.bulk_create(
+            EuControlDeadline(registration=f'SAME{i:02d}', due_date=due_date) for i in range(5)
+        )
+
+        seen = []
+        url, params = self.url, {'days': 7, 'page_size': 2}
+        while url:
+            response = self.client.get(url, params)
+            seen += [row['registration'] for row in response.data['results']]
+            url, params = response.data['next'], None
+
+        self.assertEqual(seen, ['SOON1', 'SAME00', 'SAME01', 'SAME02', 'SAME03', 'SAME04'])
+
+    def test_deep_page_is_a_range_scan(self):
+        """Test that a later page seeks past the cursor instead of skipping rows"""
+        response = self.client.get(self.url, {'days': 365, 'page_size': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data['next'])
+
+        sqls = [q['sql'] for q in queries.captured_queries]
+        self.assertIn('"registration" >', sqls[0])
+        for sql in sqls:
+            self.assertNotIn('OFFSET', sql.upper())
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            self.assertIn('USING COVERING INDEX eu_control_due_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is a 404, like DRF's cursor pagination"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_days(self):
+        """Test that a non-numeric or negative days parameter is rejected"""
+        for days in ('abc', '-1'):
+            response = self.client.get(self.url, {'days': days})
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('error', response.data)
+
+
+class UpstreamCorpusTests(TestCase):
+    """
+    Test suite for recording upstream responses and replaying them offline.
+    """
+
+    def setUp(self):
+        """Point the corpus at a scratch directory"""
+        self.client = APIClient()
+        self.url = reverse('vehicle-lookup')
+        registration_numbers.clear_not_found_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.document = {
+            'kjennemerke': 'AB12345',
+            'kjoretoydataListe': [{
+                'kjoretoyId': {'kjennemerke': 'AB12345', 'understellsnummer': 'YV1ABC12345678901'},
+                'godkjenning': {'tekniskGodkjenning': {'tekniskeData': {'generelt': {
+                    'merke': [{'merke': 'Volvo'}], 'handelsbetegnelse': ['V70'], 'aarsmodell': '2012',
+                }}}},
+                'periodiskKjoretoyKontroll': {'kontrollfrist': '2026-05-31'},
+            }],
+        }
+
+    def upstream_response(self, status_code=200, document=None):
+        return upstream_response(status_code, document or self.document)
+
+    def record(self, registration, response):
+        with override_settings(VEGVESEN_CLIENT_MODE='record', VEGVESEN_CORPUS_DIR=self.tmp.name), \
+                patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key'), \
+                patch('vehicles.client.session.get', return_value=response):
+            return self.client.get(self.url, {'registration': registration})
+
+    def test_record_scrubs_sensitive_fields(self):
+        """Test that recorded responses are saved without the VIN"""
+        self.record('AB12345', self.upstream_response())
+
+        entry = get_corpus(self.tmp.name).entries()['AB12345']
+        self.assertEqual(entry['status_code'], 200)
+        self.assertEqual(entry['latency_ms'], 250.0)
+        vehicle_id = entry['body']['kjoretoydataListe'][0]['kjoretoyId']
+        self.assertEqual(vehicle_id['understellsnummer'], 'REDACTED')
+        self.assertEqual(vehicle_id['kjennemerke'], 'AB12345')
+
+    @patch('vehicles.corpus.time.sleep')
+    @patch('vehicles.client.session.get')
+    def test_replay_without_network(self, mock_get, mock_sleep):
+        """Test that replay mode answers from the corpus with recorded latency"""
+        self.record('AB12345', self.upstream_response())
+        self.record('XX99999', self.upstream_response(404, {'error': 'not found'}))
+        EuControlDeadline.objects.all().delete()
+        registration_numbers.clear_not_found_cache()
+
+        with override_settings(VEGVESEN_CLIENT_MODE='replay', VEGVESEN_CORPUS_DIR=self.tmp.name,
+                               VEGVESEN_REPLAY_LATENCY_SCALE=2.0), \
+                patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key'):
+            found = self.client.get(self.url, {'registration': 'AB12345'})
+            missing = self.client.get(self.url, {'registration': 'XX99999'})
+            unknown = self.client.get(self.url, {'registration': 'ZZ11111'})
+
+        mock_get.assert_not_called()
+        mock_sleep.assert_called_with(0.5)
+        self.assertEqual(found.status_code, status.HTTP_200_OK)
+        self.assertEqual(found.data['brand'], 'Volvo')
+        self.assertEqual(found.data['nextEuApproval'], '2026-05-31')
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn(unknown.status_code, (status.HTTP_200_OK, status.HTTP_404_NOT_FOUND))
+        # Replayed answers are made up for other plates: nothing is stored
+        self.assertFalse(EuControlDeadline.objects.exists())
+        self.assertFalse(registration_numbers.is_known_missing('XX99999'))
+
+    def test_benchmark_command(self):
+        """Test that the benchmark runs both phases against the corpus"""
+        self.record('AB12345', self.upstream_response())
+        out = io.StringIO()
+
+        call_command('benchmark_vehicle_lookup', '--iterations', '20', '--corpus', self.tmp.name, stdout=out)
+
+        self.assertIn('Extraction: 20 documents', out.getvalue())
+        self.assertIn('Lookups: 20', out.getvalue())
+        with self.assertRaisesMessage(CommandError, '--iterations must be at least 1'):
+            call_command('benchmark_vehicle_lookup', '--iterations', '0', '--corpus', self.tmp.name, stdout=out)
+
+
+@patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
+@override_settings(VEGVESEN_LATENCY_MIN_SAMPLES=5)
+class UpstreamTimeoutTests(TestCase):
+    """Test adaptive upstream timeouts and hedged lookups"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('vehicle-lookup')
+        vegvesen_client.reset_latency_stats()
+        registration_numbers.clear_not_found_cache()
+        self.addCleanup(vegvesen_client.reset_latency_stats)
+
+    def _ok_response(self):
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {'kjoretoydataListe': [{}]}
+        return response
+
+    def _warm_up(self, seconds, samples=5):
+        for _ in range(samples):
+            vegvesen_client.latency_window.record(seconds)
+
+    def test_default_timeout_without_samples(self):
+        """Test the fixed timeout is used until enough latencies are recorded"""
+        self._warm_up(0.3, samples=4)
+        self.assertEqual(vegvesen_client.current_timeout(), 10)
+
+    @patch('vehicles.client.session.get')
+    def test_timeout_follows_recent_latencies(self, mock_get):
+        """Test the timeout is a multiple of p99 latency, within the configured bounds"""
+        mock_get.return_value = self._ok_response()
+        self._warm_up(1.2)
+
+        self.client.get(self.url, {'registration': 'AB12345'})
+        self.assertEqual(mock_get.call_args[1]['timeout'], 3.6)
+
+        self._warm_up(0.1, samples=200)
+        self.assertEqual(vegvesen_client.current_timeout(), 2.0)
+        self._warm_up(30, samples=200)
+        self.assertEqual(vegvesen_client.current_timeout(), 10)
+
+    @patch('vehicles.client.session.get')
+    def test_timeouts_widen_the_window(self, mock_get):
+        """Test timed-out calls are recorded at the timeout value"""
+        mock_get.side_effect = requests.Timeout('Connection timeout')
+        self.client.get(self.url, {'registration': 'AB12345'})
+        self.assertEqual(vegvesen_client.latency_window.percentile(100), 10)
+
+    @override_settings(VEGVESEN_HEDGE_ENABLED=True)
+    @patch('vehicles.client.session.get')
+    def test_hedged_request_wins(self, mock_get):
+        """Test a slow first request is hedged and the faster answer is used"""
+        release = threading.Event()
+        slow = self._ok_response()
+        slow.status_code = 503
+        fast = self._ok_response()
+
+        def upstream(*args, **kwargs):
+            if mock_get.call_count == 1:
+                release.wait(5)
+                return slow
+            return fast
+
+        mock_get.side_effect = upstream
+        self._warm_up(0.01)
+        response = self.client.get(self.url, {'registration': 'AB12345'})
+        release.set()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @override_settings(VEGVESEN_HEDGE_ENABLED=True)
+    @patch('vehicles.client.session.get')
+    def test_hedge_budget_is_capped(self, mock_get):
+        """Test no hedge is sent once the budget is spent"""
+        def upstream(*args, **kwargs):
+            threading.Event().wait(0.05)
+            return self._ok_response()
+
+        mock_get.side_effect = upstream
+        self._warm_up(0.01)
+        while vegvesen_client.hedge_budget.withdraw():
+            pass
+
+        response = self.client.get(self.url, {'registration': 'AB12345'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @override_settings(VEGVESEN_HEDGE_ENABLED=True)
+    @patch('vehicles.client.session.get')
+    def test_busy_hedge_threads_never_queue_the_lookup(self, mock_get):
+        """Test a lookup runs unhedged on the request thread when every hedge thread is busy"""
+        mock_get.return_value = self._ok_response()
+        self._warm_up(0.01)
+        vegvesen_client._get_executor()
+        held = 0
+        while vegvesen_client._free_threads.acquire(blocking=False):
+            held += 1
+        self.addCleanup(lambda: [vegvesen_client._free_threads.release() for _ in range(held)])
+
+        response = self.client.get(self.url, {'registration': 'AB12345'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_failed_submit_gives_the_thread_back(self):
+        """Test a submit that raises (e.g. executor shut down) doesn't use up a hedge thread"""
+        executor = vegvesen_client._get_executor()
+        with patch.object(executor, 'submit', side_effect=RuntimeError('shutdown')):
+            for _ in range(settings.VEGVESEN_HEDGE_THREADS + 1):
+                with self.assertRaises(RuntimeError):
+                    vegvesen_client._submit({}, {}, 1)
+
+        held = 0
+        while vegvesen_client._free_threads.acquire(blocking=False):
+            held += 1
+        for _ in range(held):
+            vegvesen_client._free_threads.release()
+        self.assertEqual(held, settings.VEGVESEN_HEDGE_THREADS)
+
+    @override_settings(VEGVESEN_HEDGE_ENABLED=True)
+    @patch('vehicles.client.session.get')
+    def test_losing_response_is_closed(self, mock_get):
+        """Test the slower of the two requests has its response closed once it arrives"""
+        release = threading.Event()
+        slow = self._ok_response()
+
+        def upstream(*args, **kwargs):
+            if mock_get.call_count == 1:
+                release.wait(5)
+                return slow
+            return self._ok_response()
+
+        mock_get.side_effect = upstream
+        self._warm_up(0.01)
+        self.client.get(self.url, {'registration': 'AB12345'})
+        release.set()
+
+        for _ in range(100):
+            if slow.close.called:
+                break
+            threading.Event().wait(0.01)
+        slow.close.assert_called_once()
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a fixed vehicle payload, over a keep-alive connection."""
+    protocol_version = 'HTTP/1.1'
+    body = json.dumps(vehicle_payload()).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@patch('vehicles.views.settings.STATENS_VEGVESEN_API_KEY', 'test-api-key')
+class UpstreamTracingTests(TestCase):
+    """
+    Test suite for the upstream spans and their phase timings.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('vehicle-lookup')
+        vegvesen_client.reset_latency_stats()
+        registration_numbers.clear_not_found_cache()
+        self.addCleanup(registration_numbers.clear_not_found_cache)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _UpstreamHandler)
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        upstream_url = f'http://127.0.0.1:{server.server_address[1]}/kjoretoydata'
+        patcher = patch('vehicles.client.VEGVESEN_API_URL', upstream_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Connections from earlier tests went to other ports; start from an empty pool
+        vegvesen_client.session.close()
+
+        trace_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(trace_dir.cleanup)
+        self.trace_file = os.path.join(trace_dir.name, 'traces.jsonl')
+        settings_override = override_settings(TRACE_FILE=self.trace_file)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(tracing.close_export_file)
+
+    def spans(self):
+        tracing.close_export_file()
+        with open(self.trace_file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_lookup_exports_spans_in_the_request_trace(self):
+        """Test the lookup and request spans continue the caller's traceparent"""
+        trace_id = '4bf92f3577b34da6a3ce929d0e0e4736'
+        response = self.client.get(
+            self.url, {'registration': 'AB12345'},
+            HTTP_TRACEPARENT=f'00-{trace_id}-00f067aa0ba902b7-01',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Trace-Id'], trace_id)
+
+        request_span, lookup_span = self.spans()
+        self.assertEqual(lookup_span['name'], 'vegvesen.lookup')
+        self.assertEqual(lookup_span['trace_id'], trace_id)
+        self.assertEqual(lookup_span['parent_span_id'], '00f067aa0ba902b7')
+        self.assertEqual(lookup_span['attributes']['cache.outcome'], 'miss')
+        self.assertEqual(lookup_span['attributes']['http.status_code'], 200)
+
+        self.assertEqual(request_span['name'], 'vegvesen.request')
+        self.assertEqual(request_span['parent_span_id'], lookup_span['span_id'])
+        attributes = request_span['attributes']
+        self.assertEqual(attributes['http.response.size'], len(_UpstreamHandler.body))
+        self.assertFalse(attributes['http.connection_reused'])
+        for phase in ('dns', 'connect', 'tls', 'send', 'wait', 'download'):
+            self.assertGreaterEqual(attributes[f'timing.{phase}_ms'], 0)
+        self.assertGreater(attributes['timing.connect_ms'], 0)
+        self.assertEqual(attributes['timing.tls_ms'], 0)  # plain HTTP
+
+    def test_second_lookup_reuses_the_connection(self):
+        """Test a pooled connection is reported as reused, with no connect time"""
+        self.client.get(self.url, {'registration': 'AB12345'})
+        self.client.get(self.url, {'registration': 'AB12346'})
+
+        second = [span for span in self.spans() if span['name'] == 'vegvesen.request'][1]
+        self.assertTrue(second['attributes']['http.connection_reused'])
+        self.assertEqual(second['attributes']['timing.connect_ms'], 0)
+
+    @patch('vehicles.client.session.get', side_effect=requests.ConnectionError('refused'))
+    def test_failed_request_span_has_error(self, mock_get):
+        """Test failed upstream calls are exported with an error status"""
+        self.client.get(self.url, {'registration': 'AB12345'})
+
+        request_span, lookup_span = self.spans()
+        self.assertEqual(request_span['status'], 'error')
+        self.assertIn('refused', request_span['attributes']['error'])
+        self.assertEqual(lookup_span['status'], 'error')
+
+    def test_not_found_cache_hit_is_traced(self):
+        """Test a lookup answered from the not-found cache records a cache hit"""
+        registration_numbers.remember_missing('XX99999')
+
+        self.client.get(self.url, {'registration': 'XX99999'})
+
+        (span,) = self.spans()
+        self.assertEqual(span['attributes']['cache.outcome'], 'hit')
+        self.assertEqual(span['attributes']['request.attempts'], 0)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import VehicleLookupView
+from .views import VehicleLookupView, EuControlDueView
 
 urlpatterns = [
     path("lookup/", VehicleLookupView.as_view(), name="vehicle-lookup"),
+    path("eu-control/due/", EuControlDueView.as_view(), name="eu-control-due"),
 ]
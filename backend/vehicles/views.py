@@ -1,10 +1,26 @@
-import requests
+import binascii
 import json
+import logging
+from base64 import b64decode, b64encode
+
+import requests
+from datetime import date, timedelta
 from django.conf import settings
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.utils.urls import replace_query_param
+
+from . import client
+from . import registration as registration_numbers
+from .models import EuControlDeadline
+from .serializers import EuControlDeadlineSerializer
+
+logger = logging.getLogger(__name__)
 
 
 class VehicleLookupView(APIView):
@@ -17,8 +33,8 @@ class VehicleLookupView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        # Get registration number from query params
-        registration = request.query_params.get('registration', '').strip()
+        # Normalise first, so 'ab 12-345' and 'AB12345' are the same plate
+        registration = registration_numbers.normalize(request.query_params.get('registration', ''))
 
         if not registration:
             return Response(
@@ -26,13 +42,18 @@ class VehicleLookupView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Validate registration format (2-7 characters)
-        if len(registration) < 2 or len(registration) > 7:
+        # Plates that can't be Norwegian never reach the upstream
+        if not registration_numbers.is_valid(registration):
             return Response(
-                {'error': 'Registration number must be between 2 and 7 characters'},
+                {'error': registration_numbers.INVALID_MESSAGE},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Recently confirmed missing: don't spend upstream quota on it again
+        if registration_numbers.is_known_missing(registration):
+            client.record_cache_hit(registration)
+            return self._not_found_response()
+
         # Get API key from settings
         api_key = settings.STATENS_VEGVESEN_API_KEY
         if not api_key:
@@ -41,31 +62,21 @@ class VehicleLookupView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        # Call Statens Vegvesen API
-        url = 'https://akfell-datautlevering.atlas.vegvesen.no/enkeltoppslag/kjoretoydata'
-        headers = {
-            'SVV-Authorization': f'Apikey {api_key}'
-        }
-        params = {
-            'kjennemerke': registration.upper()
-        }
-
+        # Call Statens Vegvesen API (pooled session, see client.py)
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = client.fetch_vehicle(registration, api_key)
 
             # Handle different status codes
             if response.status_code == 200:
                 data = response.json()
 
-                # DEBUG: Print raw API response
-                print("\n" + "="*80)
-                print("DEBUG: Raw API Response from Statens Vegvesen")
-                print("="*80)
-                print(json.dumps(data, indent=2, ensure_ascii=False))
-                print("="*80 + "\n")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('Raw API response from Statens Vegvesen:\n%s', json.dumps(data, indent=2, ensure_ascii=False))
 
                 # Extract relevant vehicle information
                 vehicle_data = self._extract_vehicle_data(data)
+                if not client.is_replaying():
+                    self._store_eu_control_deadline(registration, vehicle_data['nextEuApproval'])
                 return Response(vehicle_data, status=status.HTTP_200_OK)
 
             elif response.status_code == 400:
@@ -88,10 +99,9 @@ class VehicleLookupView(APIView):
 
             elif response.status_code == 404:
                 # Vehicle not found with the given registration number
-                return Response(
-                    {'error': 'Please enter a correct registration number. Vehicle not found.'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+                if not client.is_replaying():
+                    registration_numbers.remember_missing(registration)
+                return self._not_found_response()
 
             else:
                 # Handle other error responses
@@ -119,6 +129,30 @@ class VehicleLookupView(APIView):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
+    def _not_found_response(self):
+        return Response(
+            {'error': 'Please enter a correct registration number. Vehicle not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    def _store_eu_control_deadline(self, registration, next_eu_approval):
+        """
+        Save the next EU control deadline so it can be queried without
+        calling the upstream again. Single INSERT ... ON CONFLICT DO UPDATE.
+        """
+        try:
+            due_date = date.fromisoformat(next_eu_approval)
+        except (TypeError, ValueError):
+            # 'N/A' or an unexpected format: nothing to store
+            return
+
+        EuControlDeadline.objects.bulk_create(
+            [EuControlDeadline(registration=registration, due_date=due_date)],
+            update_conflicts=True,
+            unique_fields=['registration'],
+            update_fields=['due_date', 'updated_at'],
+        )
+
     def _extract_vehicle_data(self, data):
         """
         Extract relevant vehicle information from the API response.
@@ -146,23 +180,17 @@ class VehicleLookupView(APIView):
 
             vehicle_info = kjoretoydataListe[0]
 
-            # DEBUG: Print vehicle_info structure
-            print("\n" + "-"*80)
-            print("DEBUG: vehicle_info keys:", list(vehicle_info.keys()))
-            print("-"*80)
+            logger.debug('vehicle_info keys: %s', list(vehicle_info.keys()))
 
             godkjenning = vehicle_info.get('godkjenning', {})
             tekniskGodkjenning = godkjenning.get('tekniskGodkjenning', {})
 
-            # DEBUG: Print tekniskGodkjenning keys
-            print("DEBUG: tekniskGodkjenning keys:", list(tekniskGodkjenning.keys()))
+            logger.debug('tekniskGodkjenning keys: %s', list(tekniskGodkjenning.keys()))
 
-            # DEBUG: Print tekniskeData structure
             tekniske_data = tekniskGodkjenning.get('tekniskeData', {})
-            print("DEBUG: tekniskeData keys:", list(tekniske_data.keys()))
+            logger.debug('tekniskeData keys: %s', list(tekniske_data.keys()))
             if 'generelt' in tekniske_data:
-                print("DEBUG: generelt keys:", list(tekniske_data['generelt'].keys()))
-            print("-"*80 + "\n")
+                logger.debug('generelt keys: %s', list(tekniske_data['generelt'].keys()))
 
             # Extract brand and model
             brand = 'N/A'
@@ -260,3 +288,109 @@ class VehicleLookupView(APIView):
                 'nextEuApproval': 'N/A',
                 'error': f'Failed to parse vehicle data: {str(e)}'
             }
+
+
+class EuControlDuePagination(BasePagination):
+    """
+    Keyset pagination over the (due_date, registration) index.
+
+    The cursor is the last row's (due_date, registration) and the next page
+    is the rows after it in (due_date, registration) order, read with range
+    scans on eu_control_due_idx however deep the page. Forward only, so
+    there is a "next" link but no "previous".
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering = ('due_date', 'registration')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            due_date, registration = b64decode(encoded.encode(), altchars=b'-_').decode().split('|', 1)
+            return date.fromisoformat(due_date), registration
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, row):
+        return b64encode(f'{row.due_date.isoformat()}|{row.registration}'.encode(), altchars=b'-_').decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            rows = list(queryset[:page_size + 1])
+        else:
+            # (due_date, registration) > cursor as two index seeks: the rest of
+            # the cursor's date, then the following dates. A single OR filter
+            # makes SQLite scan the cursor's whole date from its first plate.
+            due_date, registration = cursor
+            rows = list(queryset.filter(due_date=due_date, registration__gt=registration)[:page_size + 1])
+            if len(rows) <= page_size:
+                rows += queryset.filter(due_date__gt=due_date)[:page_size + 1 - len(rows)]
+        self.page = rows[:page_size]
+        self.has_next = len(rows) > page_size
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class EuControlDueView(APIView):
+    """
+    GET /api/vehicles/eu-control/due/?days=<N>[&include_overdue=true]
+
+    Registrations whose next EU control is due within the next N days
+    (default 30), soonest first. With include_overdue, deadlines that have
+    already passed are listed first. Served from the local deadline table,
+    never from the upstream API. Staff only (the reminder jobs use a staff
+    account): it lists every plate users have looked up.
+    """
+    permission_classes = [IsAdminUser]
+    max_days = 3650
+
+    def get(self, request):
+        days = request.query_params.get('days', '30')
+        include_overdue = request.query_params.get('include_overdue', '').lower() in ('1', 'true', 'yes')
+
+        try:
+            days = int(days)
+        except ValueError:
+            days = -1
+
+        if days < 0 or days > self.max_days:
+            return Response(
+                {'error': f'days must be a whole number between 0 and {self.max_days}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        today = timezone.localdate()
+        queryset = EuControlDeadline.objects.filter(due_date__lte=today + timedelta(days=days))
+        if not include_overdue:
+            queryset = queryset.filter(due_date__gte=today)
+        queryset = queryset.only('registration', 'due_date')
+
+        paginator = EuControlDuePagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = EuControlDeadlineSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
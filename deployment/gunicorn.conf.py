@@ -6,6 +6,7 @@ This file configures the Gunicorn WSGI HTTP server for the Django backend.
 Documentation: https://docs.gunicorn.org/en/stable/settings.html
 """
 
+import gc
 import multiprocessing
 import os
 
@@ -46,6 +47,23 @@ daemon = False
 # Preload application for better performance
 preload_app = True
 
+# Garbage collection / copy-on-write
+# With preload_app, workers share the master's memory pages until something
+# writes to them. CPython's cyclic GC touches every tracked object, which
+# dirties those pages and turns them into per-worker private memory.
+# gc.freeze() (see when_ready) moves everything loaded in the master into a
+# permanent generation that the collector ignores.
+# Check the effect with: python -m backend.memory <master_pid>
+gc_freeze = os.environ.get("GUNICORN_GC_FREEZE", "1") == "1"
+
+# Optional worker GC thresholds "gen0,gen1,gen2" (Python default: 700,10,10)
+gc_thresholds = os.environ.get("GUNICORN_GC_THRESHOLDS", "")
+
+if preload_app and gc_freeze:
+    # No collections while the app is preloaded; re-enabled at the end of
+    # when_ready (master) and in post_fork (workers)
+    gc.disable()
+
 # Graceful timeout for workers
 graceful_timeout = 30
 
@@ -78,6 +96,74 @@ def when_ready(server):
     """
     server.log.info("Gunicorn is ready. Listening on: %s", bind)
 
+    if preload_app:
+        # Import the URLconf, views and serializers once here instead of in
+        # every (recycled) worker; see `python -m backend.startup fork`
+        from backend.warmup import preload
+
+        try:
+            preload()
+        except Exception:
+            server.log.exception("Preload failed")
+
+    if preload_app and gc_freeze:
+        # No gc.collect() first: freeing objects now would leave holes in
+        # pages that workers then fill and un-share
+        gc.freeze()
+        server.log.info("gc.freeze(): %s objects shared with workers", gc.get_freeze_count())
+        # The master lives as long as the server: collect what it allocates
+        # from here on (the frozen objects are left alone)
+        gc.enable()
+
+
+def pre_fork(server, worker):
+    """
+    Called in the master just before a worker is forked.
+
+    Re-freezes anything the master allocated since the last fork, so
+    recycled workers (max_requests) start out just as shared. Garbage from
+    that time is collected first, so it isn't frozen for good; only the
+    objects allocated since the last freeze are scanned.
+    """
+    if preload_app and gc_freeze:
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Called just after a worker has been forked.
+
+    Opens the worker's DB and upstream connections so the first request
+    after a recycle isn't slow (imports already happened in when_ready).
+    """
+    from backend.warmup import warm_up
+
+    if gc_thresholds:
+        gc.set_threshold(*(int(value) for value in gc_thresholds.split(",")))
+    gc.enable()
+
+    try:
+        warm_up()
+    except Exception:
+        server.log.exception("Worker warm-up failed (pid: %s)", worker.pid)
+
+
+def worker_exit(server, worker):
+    """
+    Called in the worker process just before it exits (e.g. after max_requests).
+
+    Logs how much of the worker's memory was still shared with the master.
+    """
+    from backend.memory import smaps_rollup
+
+    mem = smaps_rollup()
+    if mem:
+        server.log.info(
+            "Worker exiting (pid: %s): %s kB private, %s kB shared",
+            worker.pid, mem["Private"], mem["Shared"],
+        )
+
 
 def on_exit(server):
     """
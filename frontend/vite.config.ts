@@ -1,16 +1,69 @@
+import { readdir, readFile, writeFile } from 'node:fs/promises'
+import { join, resolve } from 'node:path'
 import { fileURLToPath, URL } from 'node:url'
+import { promisify } from 'node:util'
+import { brotliCompress, constants, gzip } from 'node:zlib'
 
-import { defineConfig } from 'vite'
+import { defineConfig, type Plugin } from 'vite'
 import vue from '@vitejs/plugin-vue'
 import vueJsx from '@vitejs/plugin-vue-jsx'
 import vueDevTools from 'vite-plugin-vue-devtools'
 
+const gzipAsync = promisify(gzip)
+const brotliAsync = promisify(brotliCompress)
+
+// Writes .gz and .br copies of the build output so nginx can serve them with
+// gzip_static / brotli_static instead of compressing on every request
+function precompress(): Plugin {
+  const compressible = /\.(js|mjs|css|html|svg|json|txt|xml|map|ico)$/
+  const minSize = 1024
+  let outDir = 'dist'
+
+  return {
+    name: 'precompress',
+    apply: 'build',
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir)
+    },
+    async closeBundle() {
+      const files = await readdir(outDir, { recursive: true })
+      await Promise.all(
+        files
+          .filter((file) => compressible.test(file))
+          .map(async (file) => {
+            const path = join(outDir, file)
+            const content = await readFile(path)
+            if (content.length < minSize) return
+
+            const variants: [string, Buffer][] = [
+              ['.gz', await gzipAsync(content, { level: 9 })],
+              [
+                '.br',
+                await brotliAsync(content, {
+                  params: {
+                    [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+                    [constants.BROTLI_PARAM_SIZE_HINT]: content.length,
+                  },
+                }),
+              ],
+            ]
+            for (const [suffix, compressed] of variants) {
+              // Only keep a copy that is actually smaller
+              if (compressed.length < content.length) await writeFile(path + suffix, compressed)
+            }
+          }),
+      )
+    },
+  }
+}
+
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [
     vue(),
     vueJsx(),
     vueDevTools(),
+    precompress(),
   ],
   resolve: {
     alias: {